@@ -0,0 +1,114 @@
+# HULHE_env/betting_table.py
+
+import numpy as np
+
+# 每条街的下注状态是一个很小的有限集合，这里把它编码为一个整数，并预计算:
+#   LEGAL_MASK[state, affordable]            -> 合法动作位掩码 (第i位对应动作i)
+#   NEXT_STATE[state, action, outcome]       -> 对手行动时的新状态 (本轮结束或弃牌时为-1)
+#   ROUND_OVER[state, action, outcome]       -> 该动作之后本轮下注是否结束
+# 状态总是从“当前行动者”的角度描述，由以下几个位组成:
+#   raises      本轮已完成的完整加注次数 (0..RAISE_LIMIT)
+#   capped      本轮是否已被不完整All-in加注封顶
+#   facing      行动者是否需要跟注 (对手的本轮下注更多)
+#   lr_opp      最后加注者 (或本轮无人加注时的大盲) 是否是对手
+#   opp_all_in  对手是否已经All-in
+#   opp_short   对手All-in的下注少于当前下注额 (只出现在翻前开局: 大盲因盲注All-in且不足一个大盲)，不能再加注
+# 与筹码数额有关的两个条件由调用方在每一步计算后作为下标传入:
+#   affordable  行动者的筹码是否多于跟注额 (否则不能加注)
+#   outcome     下注的结果: 普通 / 行动者因此All-in / 不完整的All-in加注
+# 规则与原PokerEnv.get_legal_actions / _is_betting_over完全一致 (包括翻前小盲跟注后大盲没有option)。
+FOLD, CHECK, CALL, RAISE = range(4)
+NUM_ACTIONS = 4
+RAISE_LIMIT = 3 # 1 bet + 3 raises
+OUTCOME_NORMAL, OUTCOME_ALL_IN, OUTCOME_ALL_IN_SHORT = range(3)
+NUM_OUTCOMES = 3
+
+# opp_short作为最高位，不含它的状态编号不变
+_OPP_SHORT_BIT = (RAISE_LIMIT + 1) * 16
+NUM_STATES = _OPP_SHORT_BIT * 2
+
+def encode_state(raises, capped, facing, lr_opp, opp_all_in, opp_short=0):
+    return (((raises * 2 + capped) * 2 + facing) * 2 + lr_opp) * 2 + opp_all_in + opp_short * _OPP_SHORT_BIT
+
+def decode_state(state):
+    opp_short, state = divmod(state, _OPP_SHORT_BIT)
+    state, opp_all_in = divmod(state, 2)
+    state, lr_opp = divmod(state, 2)
+    state, facing = divmod(state, 2)
+    raises, capped = divmod(state, 2)
+    return raises, capped, facing, lr_opp, opp_all_in, opp_short
+
+# 每条街开始时的状态: 翻前小盲面对大盲的下注 (大盲视为最后加注者，筹码极少时可能已因盲注All-in，
+# 不足一个大盲时为PREFLOP_START_BB_SHORT)；翻后大盲先行动
+PREFLOP_START = encode_state(0, 0, 1, 1, 0)
+PREFLOP_START_BB_ALL_IN = encode_state(0, 0, 1, 1, 1)
+PREFLOP_START_BB_SHORT = encode_state(0, 0, 1, 1, 1, 1)
+POSTFLOP_START = encode_state(0, 0, 0, 0, 0)
+
+def _legal_mask(state, affordable):
+    raises, capped, facing, _, opp_all_in, opp_short = decode_state(state)
+    mask = 1 << FOLD
+    mask |= 1 << (CALL if facing else CHECK)
+    # 对手All-in且行动者不需要跟注，或对手的All-in不足当前下注额 = 对手是下注较少的一方 (opponent_is_all_in_shorter)，不能再加注
+    if raises < RAISE_LIMIT and not capped and not (opp_all_in and (opp_short or not facing)) and affordable:
+        mask |= 1 << RAISE
+    return mask
+
+def _transition(state, action, outcome):
+    """
+    返回 (next_state, round_over)。next_state为-1表示本轮结束或弃牌。
+    """
+    raises, capped, facing, lr_opp, opp_all_in, _ = decode_state(state)
+    if action == FOLD: return -1, False
+    # 对手已All-in时，行动者的任何应对都会使下注结束 (跟注/全下跟注/加注后退还多余部分)
+    if opp_all_in: return -1, True
+    if action == RAISE:
+        if outcome == OUTCOME_ALL_IN_SHORT:
+            # 不完整加注: 不计入加注次数、不改变最后加注者，本轮封顶
+            return encode_state(raises, 1, 1, 1 - lr_opp, 1), False
+        return encode_state(raises + 1, capped, 1, 1, int(outcome == OUTCOME_ALL_IN)), False
+    # check / call 之后双方下注相等: 行动权回到最后加注者时本轮结束；跟注导致All-in时也立即结束
+    if action == CALL and outcome != OUTCOME_NORMAL: return -1, True
+    if lr_opp: return -1, True
+    return encode_state(raises, capped, 0, 1 - lr_opp, 0), False
+
+def build_betting_table():
+    legal_mask = np.zeros((NUM_STATES, 2), dtype=np.uint8)
+    next_state = np.full((NUM_STATES, NUM_ACTIONS, NUM_OUTCOMES), -1, dtype=np.int16)
+    round_over = np.zeros((NUM_STATES, NUM_ACTIONS, NUM_OUTCOMES), dtype=bool)
+    for state in range(NUM_STATES):
+        for affordable in range(2):
+            legal_mask[state, affordable] = _legal_mask(state, affordable)
+        for action in range(NUM_ACTIONS):
+            if not _legal_mask(state, 1) >> action & 1: continue
+            for outcome in range(NUM_OUTCOMES):
+                next_state[state, action, outcome], round_over[state, action, outcome] = _transition(state, action, outcome)
+    return legal_mask, next_state, round_over
+
+LEGAL_MASK, NEXT_STATE, ROUND_OVER = build_betting_table()
+LEGAL_BOOL = (LEGAL_MASK[:, :, None] >> np.arange(NUM_ACTIONS) & 1).astype(bool)
+STATE_FIELDS = np.array([decode_state(s) for s in range(NUM_STATES)], dtype=np.int8)
+STATE_RAISES, STATE_CAPPED, STATE_FACING, STATE_LR_OPP, STATE_OPP_ALL_IN, STATE_OPP_SHORT = STATE_FIELDS.T
+
+def enumerate_betting_tree(start=POSTFLOP_START, max_depth=16):
+    """
+    枚举一条街的公共下注树 (不含All-in与筹码不足的分支)，供CFR一类的求解器使用。
+    返回节点列表，每个节点为 (动作序列, 状态, 类型)，类型为 'decision' / 'round_over' / 'fold'。
+    """
+    nodes = []
+
+    def visit(sequence, state):
+        nodes.append((sequence, state, 'decision'))
+        if len(sequence) >= max_depth: return
+        for action in range(NUM_ACTIONS):
+            if not LEGAL_MASK[state, 1] >> action & 1: continue
+            child = sequence + (action,)
+            if action == FOLD:
+                nodes.append((child, state, 'fold'))
+            elif ROUND_OVER[state, action, OUTCOME_NORMAL]:
+                nodes.append((child, state, 'round_over'))
+            else:
+                visit(child, int(NEXT_STATE[state, action, OUTCOME_NORMAL]))
+
+    visit((), start)
+    return nodes
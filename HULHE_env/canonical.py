@@ -0,0 +1,71 @@
+# HULHE_env/canonical.py
+
+import numpy as np
+
+# 花色同构: 只相差花色重命名的牌面在策略上完全等价 (花色之间没有大小)。
+# 规范化的做法是为每个花色计算“签名”——它在每组牌中出现的rank掩码依次拼接成的整数；
+# 两个牌面互为同构当且仅当它们的签名多重集合相同。把花色按签名从大到小重新编号为0..3，
+# 签名相同的花色可以任意互换而结果不变，因此得到的就是同构类中唯一的规范代表。
+NUM_SUITS = 4
+RANK_BITS = 13
+# 信息集中的分组: 手牌 / 翻牌 / 转牌 / 河牌。组内的顺序无关，组与组之间不能交换
+BOARD_GROUPS = ((0, 3), (3, 4), (4, 5))
+# (N, 7)批量牌面 [手牌x2, 公共牌x5] 每一列所属的组
+SLOT_GROUPS = np.array([0, 0, 1, 1, 1, 2, 3])
+
+def suit_signatures(groups):
+    signatures = [0] * NUM_SUITS
+    for cards in groups:
+        for s in range(NUM_SUITS): signatures[s] <<= RANK_BITS
+        for c in cards: signatures[c & 3] |= 1 << (c >> 2)
+    return signatures
+
+def canonical_suit_map(groups):
+    """
+    返回 原花色 -> 规范花色 的映射列表。
+    """
+    signatures = suit_signatures(groups)
+    order = sorted(range(NUM_SUITS), key=signatures.__getitem__, reverse=True)
+    suit_map = [0] * NUM_SUITS
+    for new_suit, old_suit in enumerate(order): suit_map[old_suit] = new_suit
+    return suit_map
+
+def canonicalize(hand, board):
+    """
+    将一名玩家的信息 (手牌, 公共牌) 映射为规范形式: 花色重新编号后，手牌和翻牌按下标升序排列，
+    转牌和河牌保持原位。牌为cards.py中的紧凑下标，返回 (hand, board, suit_map)。
+    """
+    groups = [list(hand)] + [list(board[start:end]) for start, end in BOARD_GROUPS]
+    suit_map = canonical_suit_map(groups)
+    groups = [sorted(c - (c & 3) + suit_map[c & 3] for c in cards) for cards in groups]
+    return groups[0], groups[1] + groups[2] + groups[3], suit_map
+
+def canonicalize_batch(cards):
+    """
+    canonicalize的向量化版本。cards为(N, 7)的 [手牌x2, 公共牌x5]，未发出的公共牌为-1。
+    返回规范化后的新数组，结果与逐行调用canonicalize一致。
+    """
+    cards = np.asarray(cards, dtype=np.int64)
+    n = len(cards)
+    rows = np.arange(n)[:, None]
+    valid = cards >= 0
+    suits = cards & 3
+    bits = np.where(valid, np.left_shift(1, (cards >> 2) + RANK_BITS * (3 - SLOT_GROUPS)), 0)
+
+    signatures = np.zeros((n, NUM_SUITS), dtype=np.int64)
+    for s in range(NUM_SUITS):
+        signatures[:, s] = np.where(valid & (suits == s), bits, 0).sum(axis=1)
+    order = np.argsort(-signatures, axis=1, kind='stable')
+    suit_map = np.empty_like(order)
+    suit_map[rows, order] = np.arange(NUM_SUITS)
+
+    out = np.where(valid, cards - suits + suit_map[rows, suits], -1)
+    out[:, 0:2].sort(axis=1)
+    out[:, 2:5].sort(axis=1)
+    return out
+
+def matchup_key(hand0, hand1, board):
+    """
+    双方手牌均已知时 (例如胜率计算) 的花色同构键，公共牌作为一组、不区分街。
+    """
+    return tuple(sorted(suit_signatures((hand0, hand1, board))))
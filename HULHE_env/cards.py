@@ -0,0 +1,15 @@
+# HULHE_env/cards.py
+
+import numpy as np
+from treys import Card
+
+# 紧凑的整数牌面表示: index = rank * 4 + suit
+# rank 顺序与 encoder.CARD_RANK 一致，suit 顺序与 encoder.CARD_SUIT 一致。
+CARD_RANK = '23456789TJQKA'
+CARD_SUIT = 'shdc'
+NUM_CARDS = 52
+
+INDEX_TO_STR = [r + s for r in CARD_RANK for s in CARD_SUIT]
+STR_TO_INDEX = {s: i for i, s in enumerate(INDEX_TO_STR)}
+INDEX_TO_TREYS = np.array([Card.new(s) for s in INDEX_TO_STR], dtype=np.int64)
+TREYS_TO_INDEX = {int(c): i for i, c in enumerate(INDEX_TO_TREYS)}
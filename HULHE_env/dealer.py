@@ -0,0 +1,155 @@
+# HULHE_env/dealer.py
+
+import numpy as np
+
+from HULHE_env.cards import NUM_CARDS, INDEX_TO_TREYS
+
+# 每局一条发牌记录: [P0手牌x2, P1手牌x2, 公共牌x5] (cards.py中的紧凑下标)，以及P0的随机初始筹码
+DEAL_SIZE = 9
+BOARD_SLOT = 4
+# 随机筹码模式下P0的筹码区间 (含两端)，与PokerEnv.reset的规则一致
+P0_STACK_RANGE = (5, 15)
+# 按块批量生成，块大小从MIN_BLOCK_SIZE起倍增到BLOCK_SIZE (只打几局的环境不必预先生成整块)。
+# 块的划分是固定的，因此发牌序列只取决于种子，与每次取多少局无关
+MIN_BLOCK_SIZE = 64
+BLOCK_SIZE = 4096
+
+_INDEX_TO_TREYS = INDEX_TO_TREYS.tolist()
+
+def fresh_seed():
+    """
+    未给定种子时抽取一个具体的种子 (63位非负整数)，记录下来即可复现这次运行。
+    """
+    return int(np.random.SeedSequence().entropy % (1 << 63))
+
+def env_rng(seed):
+    """
+    环境自身的随机数流 (初始庄家、determinize)，由同一个seed派生但与发牌流相互独立。
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+
+def equity_seed(seed):
+    """
+    All-in EV蒙特卡洛 (EquityCalculator) 的种子，由同一个seed派生，与发牌流和env_rng都相互独立。
+    """
+    return np.random.SeedSequence(seed).spawn(2)[1]
+
+def generate_deals(rng, count):
+    """
+    用rng生成count局的发牌: 对每行并行做DEAL_SIZE步Fisher-Yates (只打乱前9张)，
+    返回 (cards (count, 9) int8, p0_stacks (count,) int16)。
+    """
+    decks = np.tile(np.arange(NUM_CARDS, dtype=np.int8), (count, 1))
+    rows = np.arange(count)
+    for i in range(DEAL_SIZE):
+        j = rng.integers(i, NUM_CARDS, size=count)
+        picked = decks[rows, j]
+        decks[rows, j] = decks[:, i]
+        decks[:, i] = picked
+    p0_stacks = rng.integers(P0_STACK_RANGE[0], P0_STACK_RANGE[1] + 1, size=count).astype(np.int16)
+    return np.ascontiguousarray(decks[:, :DEAL_SIZE]), p0_stacks
+
+def save_deals(path, cards, p0_stacks, seed=None):
+    """
+    把一段发牌流写入.npz文件，可由load_deals / Dealer.from_file原样回放。
+    seed为产生这段发牌的环境种子，回放时环境由它派生初始庄家等其余随机数流。
+    """
+    np.savez(path, cards=np.asarray(cards, dtype=np.int8), p0_stacks=np.asarray(p0_stacks, dtype=np.int16),
+             seed=np.array('' if seed is None else str(seed)))
+
+def load_deals(path):
+    """
+    读取save_deals写出的文件，返回 (cards, p0_stacks, seed)，未记录种子时seed为None。
+    """
+    with np.load(path) as data:
+        seed = str(data['seed'])
+        return data['cards'], data['p0_stacks'], int(seed) if seed else None
+
+class Deck:
+    """
+    替代treys.Deck的最小牌堆: cards为treys整数列表，draw从列表末尾取牌 (与treys相同)。
+    PokerEnv每局只把本局的5张公共牌按发牌顺序倒序放入，determinize时为全部未知牌。
+    """
+    __slots__ = ('cards',)
+
+    def __init__(self, cards=()):
+        self.cards = list(cards)
+
+    def draw(self, n=1):
+        cards = self.cards
+        return [cards.pop() for _ in range(n)]
+
+class Dealer:
+    """
+    基于NumPy Generator的发牌引擎: 每次以BLOCK_SIZE局为一块批量生成发牌，逐局 (deal) 或成批 (deal_batch) 取用。
+    给定seed时发牌序列完全确定，且与取用方式无关——PokerEnv(seed)与VecPokerEnv(n, seed=seed)发出的是同一个序列。
+    Dealer只保存当前块的两个数组，深拷贝 (例如copy.deepcopy(env)) 的代价很小。
+    也可以由保存的发牌流回放 (Dealer.from_file)，用完后抛出IndexError。回放的Dealer带有文件中记录的seed，
+    PokerEnv / VecPokerEnv在未显式给定seed时使用它，因此初始庄家、determinize和All-in EV与原运行完全相同。
+    """
+    def __init__(self, seed=None, deals=None):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self._replay = deals is not None
+        if self._replay:
+            self._cards, self._p0_stacks = np.asarray(deals[0], dtype=np.int8), np.asarray(deals[1], dtype=np.int16)
+        else:
+            self._cards, self._p0_stacks = np.empty((0, DEAL_SIZE), dtype=np.int8), np.empty(0, dtype=np.int16)
+        self._block_size = MIN_BLOCK_SIZE
+        self._pos = 0
+        self.dealt = 0
+
+    @classmethod
+    def from_file(cls, path):
+        cards, p0_stacks, seed = load_deals(path)
+        return cls(seed, deals=(cards, p0_stacks))
+
+    def _refill(self):
+        if self._replay: raise IndexError(f"Deal stream exhausted after {self.dealt} hands.")
+        self._cards, self._p0_stacks = generate_deals(self.rng, self._block_size)
+        self._block_size = min(2 * self._block_size, BLOCK_SIZE)
+        self._pos = 0
+
+    def deal(self):
+        """
+        取下一局的发牌，返回 (9张牌的下标列表, P0随机筹码)。
+        """
+        if self._pos == len(self._cards): self._refill()
+        pos = self._pos
+        self._pos += 1
+        self.dealt += 1
+        return self._cards[pos].tolist(), int(self._p0_stacks[pos])
+
+    def deal_treys(self):
+        """
+        deal的treys整数版本 (PokerEnv内部的牌面表示)。
+        """
+        cards, p0_stack = self.deal()
+        return [_INDEX_TO_TREYS[c] for c in cards], p0_stack
+
+    def deal_batch(self, count):
+        """
+        取接下来count局的发牌，返回 (cards (count, 9) int8, p0_stacks (count,) int16)。
+        """
+        cards = np.empty((count, DEAL_SIZE), dtype=np.int8)
+        p0_stacks = np.empty(count, dtype=np.int16)
+        filled = 0
+        while filled < count:
+            if self._pos == len(self._cards): self._refill()
+            take = min(count - filled, len(self._cards) - self._pos)
+            cards[filled:filled + take] = self._cards[self._pos:self._pos + take]
+            p0_stacks[filled:filled + take] = self._p0_stacks[self._pos:self._pos + take]
+            self._pos += take
+            filled += take
+        self.dealt += count
+        return cards, p0_stacks
+
+    def save(self, path, count):
+        """
+        取接下来count局的发牌并写入path，返回这批发牌。
+        在一个新的Dealer(seed)上调用即得到该种子的前count局: PokerEnv(dealer=Dealer.from_file(path))
+        的前count局与PokerEnv(seed=seed)完全相同 (文件中记录了seed，环境由它派生初始庄家等随机数流)。
+        """
+        cards, p0_stacks = self.deal_batch(count)
+        save_deals(path, cards, p0_stacks, self.seed)
+        return cards, p0_stacks
@@ -1,54 +1,105 @@
 # HULHE_env/environment.py
 
-import random
 import copy
-from treys import Deck, Evaluator, Card
+from collections import namedtuple
+from treys import Card
+
+from HULHE_env.evaluator import HandEvaluator
+from HULHE_env.cards import INDEX_TO_TREYS
+from HULHE_env.dealer import Dealer, Deck, BOARD_SLOT, env_rng, equity_seed
+from HULHE_env.equity import EquityCalculator
+from HULHE_env.history import ActionHistory, HISTORY_ACTION_INDEX, BOARD_SIZE_TO_STREET
+from HULHE_env.state_view import StateView
+from HULHE_env.betting_table import (RAISE_LIMIT, PREFLOP_START, PREFLOP_START_BB_ALL_IN, PREFLOP_START_BB_SHORT,
+                                     POSTFLOP_START, OUTCOME_NORMAL, OUTCOME_ALL_IN, OUTCOME_ALL_IN_SHORT, LEGAL_MASK, NEXT_STATE,
+                                     ROUND_OVER, STATE_RAISES, STATE_CAPPED, STATE_LR_OPP)
+
+# 动作的整数编码顺序，与encoder中的action_map保持一致
+ACTIONS = ('fold', 'check', 'call', 'raise')
+ACTION_INDEX = {a: i for i, a in enumerate(ACTIONS)}
+_FULL_DECK = INDEX_TO_TREYS.tolist()
+
+# 下注状态转移表的纯Python副本 (标量环境中列表下标比NumPy标量快得多)
+_LEGAL_MASK = LEGAL_MASK.tolist()
+_NEXT_STATE = NEXT_STATE.tolist()
+_ROUND_OVER = ROUND_OVER.tolist()
+_STATE_RAISES = STATE_RAISES.tolist()
+_STATE_CAPPED = STATE_CAPPED.tolist()
+_STATE_LR_OPP = STATE_LR_OPP.tolist()
+# 合法动作位掩码 -> 动作列表 (顺序同ACTIONS)
+_LEGAL_ACTIONS = [[a for i, a in enumerate(ACTIONS) if mask >> i & 1] for mask in range(1 << len(ACTIONS))]
+
+# snapshot()返回的不可变状态值: 只包含整数/浮点/元组和历史记录的字节串，可作为dict键、跨进程传递
+EnvSnapshot = namedtuple('EnvSnapshot', [
+    'button_player', 'current_player', 'current_bet', 'pot', 'betting_state', 'done', 'winner_info', 'players', 'community_cards', 'deck', 'history', 'float_stacks',
+])
 
 class PokerEnv:
     """
     实现了单挑限注德州扑克(HU LHE)规则的、标准化的训练环境。
     版本: v2.0 - 最终修复版，重构了All-in核心逻辑流。
     """
-    RAISE_LIMIT = 3 # 1 bet + 3 raises
-
-    def __init__(self, initial_total_stack=400, big_blind=2):
+    RAISE_LIMIT = RAISE_LIMIT
+
+    def __init__(self, initial_total_stack=400, big_blind=2, seed=None, allin_ev=False, equity_calculator=None, dealer=None):
+        # 发牌与随机筹码来自dealer (默认为Dealer(seed)，也可传入回放保存的发牌流)；
+        # 初始庄家和determinize使用由seed派生的独立随机数流。给定seed即可复现
+        self.dealer = dealer or Dealer(seed)
+        # 回放保存的发牌流时沿用其记录的种子，使初始庄家等与原运行一致
+        if seed is None and dealer is not None: seed = dealer.seed
+        self.rng = env_rng(seed)
         self.deck = Deck()
-        self.evaluator = Evaluator()
+        self.evaluator = HandEvaluator()
+        # allin_ev: 在winner_info中额外给出'ev_results'——All-in时按剩余发牌的胜率分配底池的期望输赢，
+        # 其余牌局与results相同。用作训练标签时可以去掉All-in后随机发牌带来的方差。
+        self.allin_ev = allin_ev
+        if allin_ev and equity_calculator is None: equity_calculator = EquityCalculator(self.evaluator, seed=equity_seed(seed))
+        self.equity_calculator = equity_calculator
         self.initial_total_stack = initial_total_stack
         self.big_blind = big_blind
         self.small_blind = big_blind // 2
         self.small_bet = self.big_blind
         self.big_bet = 2 * self.big_blind
         self.players = [{'stack': 0, 'hand': [], 'current_bet': 0, 'is_all_in': False, 'initial_hand_stack': 0} for _ in range(2)]
-        self.button_player = random.randint(0, 1)
-        self.is_betting_capped = False # 新增：用于标记本轮下注是否被“封顶”
+        self.button_player = int(self.rng.integers(0, 2))
+        # 本轮的下注状态 (加注次数、封顶、是否需跟注、最后加注者、对手All-in)，见betting_table.py
+        self._betting_state = PREFLOP_START
+        self.community_cards = []
+        self._community_strs = None
+        self._hand_strs_cache = None
+        self._state_view = StateView(self)
+        self._undo_stack = []
 
     def reset(self, randomize_stacks=True):
         self.button_player = 1 - self.button_player
-        self.deck.shuffle()
+        cards, random_p0_stack = self.dealer.deal_treys()
+        # 牌堆中只放本局的公共牌 (draw从末尾取牌，因此倒序放入)
+        self.deck.cards = cards[:BOARD_SLOT - 1:-1]
         self.community_cards = []
+        self._community_strs = None
+        self._hand_strs_cache = None
         self.pot = 0
-        self.raises_this_round = 0
         self.done = False
         self.winner_info = {}
-        self.action_history = []
-        self.is_betting_capped = False # 新增：重置封顶标记
+        self._undo_stack.clear()
 
         if randomize_stacks:
             # p0_stack = random.randint(10, self.initial_total_stack - 10)
-            p0_stack = random.randint(5,15)
+            p0_stack = random_p0_stack
             p1_stack = self.initial_total_stack - p0_stack
             self.players[0]['stack'] = p0_stack
             self.players[1]['stack'] = p1_stack
         else:
             for p in self.players: p['stack'] = self.initial_total_stack / 2
 
-        for p in self.players:
-            p['hand'] = self.deck.draw(2)
+        for p, start in zip(self.players, (0, 2)):
+            p['hand'] = cards[start:start + 2]
             p['current_bet'] = 0
             p['is_all_in'] = False
             p['initial_hand_stack'] = p['stack']
-            
+
+        # 每局一个新的定长记录数组 (已结束牌局的历史可能仍被日志等调用方持有)
+        self.action_history = ActionHistory(self.community_cards, float_stacks=isinstance(self.players[0]['stack'], float))
         self._post_blinds()
         return self._get_state()
 
@@ -59,60 +110,145 @@ class PokerEnv:
         self._player_bet(bb_idx, self.big_blind)
         self._record_action(bb_idx, 'big_blind')
         self.current_bet = self.big_blind
-        self.last_raiser = bb_idx
+        bb = self.players[bb_idx]
+        if not bb['is_all_in']: self._betting_state = PREFLOP_START
+        elif bb['current_bet'] < self.current_bet: self._betting_state = PREFLOP_START_BB_SHORT
+        else: self._betting_state = PREFLOP_START_BB_ALL_IN
         self.current_player = sb_idx
 
     def step(self, action):
         if self.done: raise ValueError("Game is over.")
         player_idx = self.current_player
-        if action not in self.get_legal_actions():
+        action_idx = ACTION_INDEX.get(action)
+        if action_idx is None or not self._legal_mask() >> action_idx & 1:
             raise ValueError(f"Illegal action '{action}' for Player {player_idx}.")
         
+        outcome = OUTCOME_NORMAL
         if action == 'fold': self._handle_fold(player_idx)
         elif action == 'check': self._handle_check(player_idx)
-        elif action == 'call': self._handle_call(player_idx)
-        elif action == 'raise': self._handle_raise(player_idx)
+        elif action == 'call': outcome = self._handle_call(player_idx)
+        elif action == 'raise': outcome = self._handle_raise(player_idx)
         
         self._record_action(player_idx, action)
         
-        if not self.done and self._is_betting_over():
-            self._handle_all_in_settlement()
-            self._end_betting_round()
+        # 下注轮是否结束、以及对手面对的新下注状态，都由预计算的转移表给出
+        if not self.done:
+            if _ROUND_OVER[self._betting_state][action_idx][outcome]:
+                self._handle_all_in_settlement()
+                self._end_betting_round()
+            else:
+                self._betting_state = _NEXT_STATE[self._betting_state][action_idx][outcome]
             
         return self._get_state()
 
+    # --- 树搜索支持: 快照/恢复、原地撤销、确定化 ---
+    def snapshot(self):
+        """
+        以不可变的EnvSnapshot捕获完整的牌局状态 (不含self.rng和dealer)，代价为几微秒。
+        """
+        info = tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in self.winner_info.items())
+        return EnvSnapshot(
+            self.button_player, self.current_player, self.current_bet, self.pot, self._betting_state, self.done, info,
+            tuple((p['stack'], tuple(p['hand']), p['current_bet'], p['is_all_in'], p['initial_hand_stack']) for p in self.players),
+            tuple(self.community_cards), tuple(self.deck.cards), self.action_history.tobytes(), self.action_history.float_stacks,
+        )
+
+    def restore(self, snap):
+        """
+        把环境恢复到snapshot()时的状态。同一个快照可以被恢复任意多次；撤销栈会被清空。
+        """
+        (self.button_player, self.current_player, self.current_bet, self.pot, self._betting_state, self.done) = snap[:6]
+        self.winner_info = {k: list(v) if isinstance(v, tuple) else v for k, v in snap.winner_info}
+        for p, (stack, hand, current_bet, is_all_in, initial_hand_stack) in zip(self.players, snap.players):
+            p['stack'], p['hand'], p['current_bet'] = stack, list(hand), current_bet
+            p['is_all_in'], p['initial_hand_stack'] = is_all_in, initial_hand_stack
+        self.community_cards = list(snap.community_cards)
+        self.deck.cards = list(snap.deck)
+        self.action_history = ActionHistory.frombytes(snap.history, self.community_cards, snap.float_stacks)
+        self._community_strs = None
+        self._hand_strs_cache = None
+        self._undo_stack.clear()
+        return self._get_state()
+
+    def step_undoable(self, action):
+        """
+        与step相同，但先把本步会修改的字段压入撤销栈，之后可用undo()原地回退。
+        每条记录只保存十几个标量: 牌堆与历史记录只会在末尾追加，回退时按长度截断即可。
+        """
+        p0, p1 = self.players
+        self._undo_stack.append((
+            self.current_player, self.current_bet, self.pot, self._betting_state, self.done, self.winner_info,
+            p0['stack'], p0['current_bet'], p0['is_all_in'], p1['stack'], p1['current_bet'], p1['is_all_in'],
+            len(self.community_cards), len(self.action_history),
+        ))
+        try:
+            return self.step(action)
+        except ValueError:
+            self._undo_stack.pop()
+            raise
+
+    def undo(self):
+        """
+        撤销最近一次step_undoable。
+        """
+        if not self._undo_stack: raise ValueError("Nothing to undo.")
+        p0, p1 = self.players
+        (self.current_player, self.current_bet, self.pot, self._betting_state, self.done, self.winner_info,
+         p0['stack'], p0['current_bet'], p0['is_all_in'], p1['stack'], p1['current_bet'], p1['is_all_in'],
+         num_community, self.action_history.length) = self._undo_stack.pop()
+        if len(self.community_cards) > num_community:
+            # deck.draw从列表末尾取牌，按相反顺序放回即可还原牌堆
+            self.deck.cards.extend(reversed(self.community_cards[num_community:]))
+            del self.community_cards[num_community:]
+            self._community_strs = None
+        return self._get_state()
+
+    def determinize(self, player_idx, rng=None):
+        """
+        按player_idx可见的信息 (自己的手牌与已发出的公共牌) 重新抽样对手手牌和剩余牌堆。
+        撤销栈仍然有效: 之后undo放回牌堆的只是已知的公共牌。rng默认为环境自身的随机数流。
+        """
+        rng = rng or self.rng
+        known = set(self.players[player_idx]['hand']) | set(self.community_cards)
+        unknown = [c for c in _FULL_DECK if c not in known]
+        rng.shuffle(unknown)
+        self.players[1 - player_idx]['hand'] = unknown[:2]
+        self.deck.cards = unknown[2:]
+        self._hand_strs_cache = None
+        return self._get_state()
+
     def get_legal_actions(self):
         """
         获取当前玩家的合法动作列表。
-        v2.3: 增加了对is_betting_capped的检查，以禁止在封顶后加注。
+        v3.0: 由betting_table按(下注状态, 筹码是否多于跟注额)查表得到，规则与v2.3相同
+        (包括封顶后、以及对手All-in且下注较少时禁止加注)。
         """
         if self.done: return []
-        actions = ['fold']
-        player = self.players[self.current_player]
-        opp_idx = 1 - self.current_player
-        opponent = self.players[opp_idx]
+        return list(_LEGAL_ACTIONS[self._legal_mask()])
 
-        amount_to_call = self.current_bet - player['current_bet']
+    def get_legal_mask(self):
+        """
+        当前玩家的合法动作位掩码 (第i位对应ACTIONS[i])，牌局结束时为0。供批量决策使用，避免构造列表。
+        """
+        return 0 if self.done else self._legal_mask()
 
-        # Call / Check logic
-        if amount_to_call > 0:
-            actions.append('call')
-        else:
-            actions.append('check')
+    def _legal_mask(self):
+        player = self.players[self.current_player]
+        affordable = player['stack'] > self.current_bet - player['current_bet']
+        return _LEGAL_MASK[self._betting_state][affordable]
 
-        # Raise logic
-        can_raise = self.raises_this_round < self.RAISE_LIMIT
-        opponent_is_all_in_shorter = opponent['is_all_in'] and opponent['current_bet'] < self.current_bet
+    # 以下三个字段由下注状态推导 (只读)，保留旧的属性名
+    @property
+    def raises_this_round(self):
+        return _STATE_RAISES[self._betting_state]
 
-        # 最终判断：只有在次数未满、对手未造成封顶、且本轮未被不完整加注封顶时，才可加注
-        if can_raise and not opponent_is_all_in_shorter and not self.is_betting_capped:
-            if player['stack'] > amount_to_call:
-                actions.append('raise')
-        
-        if 'call' in actions and 'check' in actions:
-            actions.remove('check')
+    @property
+    def is_betting_capped(self):
+        return bool(_STATE_CAPPED[self._betting_state])
 
-        return actions
+    @property
+    def last_raiser(self):
+        return 1 - self.current_player if _STATE_LR_OPP[self._betting_state] else self.current_player
 
     def _handle_fold(self, player_idx):
         opp_idx = 1 - player_idx
@@ -127,10 +263,11 @@ class PokerEnv:
         amount_to_call = self.current_bet - self.players[player_idx]['current_bet']
         self._player_bet(player_idx, amount_to_call)
         self.current_player = 1 - player_idx
+        return OUTCOME_ALL_IN if self.players[player_idx]['is_all_in'] else OUTCOME_NORMAL
 
     def _handle_raise(self, player_idx):
         """
-        处理加注动作，能够区分“完整加注”和“不完整All-in”。
+        处理加注动作，能够区分“完整加注”和“不完整All-in”，返回下注结果供转移表使用。
         v2.4 (Final): 修正了不完整All-in时current_bet的更新逻辑。
         """
         player = self.players[player_idx]
@@ -144,64 +281,21 @@ class PokerEnv:
         actual_bet_amount = self._player_bet(player_idx, amount_for_full_raise)
 
         # 3. 核心判断：这次下注是完整加注还是不完整All-in？
+        #    (加注次数、最后加注者和封顶标记由转移表根据返回的结果更新)
         if player['is_all_in'] and actual_bet_amount < amount_for_full_raise:
             # --- 情况B：不完整All-in ---
-            # 它不能重新开启下注轮，因此我们将下注“封顶”。
-            self.is_betting_capped = True
-            # **最终修复**: 必须更新current_bet，以确保对手正确call。
-            self.current_bet = player['current_bet']
+            # 它不能重新开启下注轮，因此下注被“封顶”。
+            outcome = OUTCOME_ALL_IN_SHORT
         else:
             # --- 情况A：完整加注 ---
-            self.current_bet = player['current_bet']
-            self.raises_this_round += 1
-            self.last_raiser = player_idx
+            outcome = OUTCOME_ALL_IN if player['is_all_in'] else OUTCOME_NORMAL
+        # **最终修复**: 必须更新current_bet，以确保对手正确call。
+        self.current_bet = player['current_bet']
 
         # 4. 无论哪种情况，行动权都转移给对手
         self.current_player = 1 - player_idx
+        return outcome
 
-    def _is_betting_over(self):
-        """
-        判断当前下注轮是否结束。
-        v2.1: 修复了All-in逻辑，确保面对All-in的玩家有最终行动权。
-        """
-        p0, p1 = self.players[0], self.players[1]
-
-        # --- Case 1: All-in Situation ---
-        # 如果有一方或双方All-in，适用特殊判断逻辑。
-        if p0['is_all_in'] or p1['is_all_in']:
-            # 如果双方都All-in，下注立即结束。
-            if p0['is_all_in'] and p1['is_all_in']:
-                return True
-
-            # 找出All-in玩家和对手。
-            if p0['is_all_in']:
-                all_in_player_idx, opp_idx = 0, 1
-            else:
-                all_in_player_idx, opp_idx = 1, 0
-
-            # 关键判断：下注轮结束的唯一条件是，对手已经完成了对All-in的响应。
-            # 这意味着对手的下注额必须等于或超过All-in玩家的下注额。
-            # （如果超过，多余部分会在_handle_all_in_settlement中退还）
-            if self.players[opp_idx]['current_bet'] >= self.players[all_in_player_idx]['current_bet']:
-                return True
-            
-            # 如果对手的下注额更小，并且现在轮到他行动，那么下注绝对没有结束。
-            if self.current_player == opp_idx:
-                return False
-
-            # 在某些极端的边角案例下（例如一方下注后断线），为确保游戏能继续，
-            # 默认在不满足上述条件时结束这一轮，但正常逻辑下走不到这里。
-            return True
-
-        # --- Case 2: Standard Situation (No one is All-in) ---
-        # 在常规情况下，下注结束需要满足两个条件：
-        # 1. 双方玩家的当前下注额相等。
-        # 2. 行动权回到了最后一个加注者（或大盲注，如果本轮无人加注）身上。
-        bets_are_equal = p0['current_bet'] == p1['current_bet']
-        action_is_closed = self.current_player == self.last_raiser
-        
-        return bets_are_equal and action_is_closed
-    
     def _handle_all_in_settlement(self):
         p0, p1 = self.players[0], self.players[1]
         if not (p0['is_all_in'] or p1['is_all_in']): return
@@ -229,15 +323,15 @@ class PokerEnv:
     def _end_betting_round(self):
         for p in self.players: p['current_bet'] = 0
         self.current_bet = 0
-        self.raises_this_round = 0
-        self.is_betting_capped = False # 新增：为下一轮重置封顶标记
-        bb_idx = 1 - self.button_player
-        self.current_player = bb_idx
-        self.last_raiser = bb_idx
+        self._betting_state = POSTFLOP_START
+        self.current_player = 1 - self.button_player
         
+        self._community_strs = None
         if self.players[0]['is_all_in'] or self.players[1]['is_all_in']:
+            ev_results = self._allin_ev_results() if self.allin_ev else None
             while len(self.community_cards) < 5: self.community_cards.extend(self.deck.draw(1))
             self._showdown()
+            if ev_results is not None: self.winner_info['ev_results'] = ev_results
             return
             
         if len(self.community_cards) == 0: self.community_cards.extend(self.deck.draw(3))
@@ -261,6 +355,15 @@ class PokerEnv:
         p0_net = self.players[0]['stack'] - self.players[0]['initial_hand_stack']
         p1_net = self.players[1]['stack'] - self.players[1]['initial_hand_stack']
         self.winner_info = {'winner': winner, 'pot': self.pot, 'reason': reason, 'results': [p0_net, p1_net]}
+        if self.allin_ev: self.winner_info['ev_results'] = [p0_net, p1_net]
+
+    def _allin_ev_results(self):
+        """
+        在发出剩余公共牌之前，按双方胜率分配底池得到的期望净输赢 (两者之和为0)。
+        """
+        p0, p1 = self.players
+        equity0 = self.equity_calculator.equity_treys(p0['hand'], p1['hand'], self.community_cards)
+        return [p['stack'] + share * self.pot - p['initial_hand_stack'] for p, share in ((p0, equity0), (p1, 1 - equity0))]
 
     def _get_round(self):
         if len(self.community_cards) == 0: return 'preflop'
@@ -269,29 +372,29 @@ class PokerEnv:
         if len(self.community_cards) == 5: return 'river'
 
     def _record_action(self, player_idx, action):
-        numeric_state = {'stacks': [p['stack'] for p in self.players], 'pot': self.pot}
-        state_snapshot = {
-            'players': [{'stack': p['stack'], 'current_bet': p['current_bet']} for p in self.players],
-            'pot': self.pot,
-            'community_cards': [Card.int_to_str(c) for c in self.community_cards],
-            'numeric_state': numeric_state
-        }
-        self.action_history.append({
-            'round': self._get_round(),
-            'player': player_idx,
-            'action': action,
-            'state_after_action': state_snapshot
-        })
+        p0, p1 = self.players
+        self.action_history.append(BOARD_SIZE_TO_STREET[len(self.community_cards)], player_idx, HISTORY_ACTION_INDEX[action],
+                                   p0['stack'], p1['stack'], self.pot, p0['current_bet'], p1['current_bet'])
+
+    def _community_card_strs(self):
+        # 公共牌只在每条街开始时变化，字符串形式按街缓存，同一街内的所有访问共享同一列表
+        if self._community_strs is None:
+            self._community_strs = [Card.int_to_str(c) for c in self.community_cards]
+        return self._community_strs
+
+    def _hand_strs(self):
+        if self._hand_strs_cache is None:
+            self._hand_strs_cache = [[Card.int_to_str(c) for c in p['hand']] for p in self.players]
+        return self._hand_strs_cache
 
     def _get_state(self):
-        return {
-            'community_cards': [Card.int_to_str(c) for c in self.community_cards],
-            'pot': self.pot,
-            'button_player': self.button_player,
-            'current_player': self.current_player,
-            'players': [{'stack': p['stack'], 'current_bet': p['current_bet']} for p in self.players],
-            'action_history': self.action_history,
-            'done': self.done,
-            'winner_info': self.winner_info,
-            'full_info': {'hands': [[Card.int_to_str(c) for c in p['hand']] for p in self.players]}
-        }
\ No newline at end of file
+        """
+        返回状态的只读视图 (见state_view.StateView)，每个环境复用同一个视图对象，不产生任何分配。
+        """
+        return self._state_view
+
+    def get_state_dict(self):
+        """
+        旧版的字典形式状态，供需要独立副本的调用方使用。
+        """
+        return self._state_view.to_dict()
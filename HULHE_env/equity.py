@@ -0,0 +1,82 @@
+# HULHE_env/equity.py
+
+import itertools
+import numpy as np
+
+from HULHE_env.cards import NUM_CARDS, TREYS_TO_INDEX
+from HULHE_env.canonical import matchup_key
+from HULHE_env.evaluator import HandEvaluator
+
+BOARD_SIZE = 5
+
+def sample_runouts(rng, remaining, count, num_samples):
+    """
+    为每个样本从remaining中无放回地抽取count张牌 (Floyd算法，按列向量化，不关心牌的顺序)。
+    返回(num_samples, count)的牌面下标。
+    """
+    m = len(remaining)
+    picks = np.empty((num_samples, count), dtype=np.int64)
+    for i, j in enumerate(range(m - count, m)):
+        t = rng.integers(0, j + 1, size=num_samples)
+        duplicate = (picks[:, :i] == t[:, None]).any(axis=1)
+        picks[:, i] = np.where(duplicate, j, t)
+    return remaining[picks]
+
+class EquityCalculator:
+    """
+    已知双方手牌时的胜率计算 (平局计一半)。
+    - 公共牌 >= exact_min_board 张时 (默认转牌、河牌) 穷举所有剩余的发牌；
+    - 更早的街使用num_samples次批量蒙特卡洛模拟。
+    结果按花色同构的规范键缓存 (河牌只需一次评估，不缓存)。牌为cards.py中的紧凑下标。
+    """
+    def __init__(self, evaluator=None, num_samples=10000, exact_min_board=4, cache_size=1 << 16, seed=None):
+        self.evaluator = evaluator or HandEvaluator()
+        self.num_samples = num_samples
+        self.exact_min_board = exact_min_board
+        self.cache_size = cache_size
+        self.rng = np.random.default_rng(seed)
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def equity(self, hand0, hand1, board=()):
+        """
+        返回hand0对hand1的胜率。
+        """
+        board = tuple(board)
+        if len(board) == BOARD_SIZE: return self._evaluate(hand0, hand1, np.array([board]))
+
+        key = matchup_key(hand0, hand1, board)
+        value = self._cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        dead = set(hand0) | set(hand1) | set(board)
+        remaining = np.array([c for c in range(NUM_CARDS) if c not in dead], dtype=np.int64)
+        count = BOARD_SIZE - len(board)
+        if len(board) >= self.exact_min_board:
+            runouts = np.array(list(itertools.combinations(remaining, count)), dtype=np.int64)
+        else:
+            runouts = sample_runouts(self.rng, remaining, count, self.num_samples)
+        known = np.broadcast_to(np.array(board, dtype=np.int64).reshape(1, -1), (len(runouts), len(board)))
+        value = self._evaluate(hand0, hand1, np.concatenate([known, runouts], axis=1))
+
+        # 缓存满时淘汰最早插入的项
+        if len(self._cache) >= self.cache_size: del self._cache[next(iter(self._cache))]
+        self._cache[key] = value
+        return value
+
+    def equity_treys(self, hand0, hand1, board=()):
+        """
+        equity的treys整数牌版本 (PokerEnv内部的牌面表示)。
+        """
+        return self.equity([TREYS_TO_INDEX[c] for c in hand0], [TREYS_TO_INDEX[c] for c in hand1],
+                           [TREYS_TO_INDEX[c] for c in board])
+
+    def _evaluate(self, hand0, hand1, boards):
+        n = len(boards)
+        score0 = self.evaluator.evaluate_batch(np.concatenate([np.broadcast_to(np.asarray(hand0), (n, 2)), boards], axis=1))
+        score1 = self.evaluator.evaluate_batch(np.concatenate([np.broadcast_to(np.asarray(hand1), (n, 2)), boards], axis=1))
+        return float(np.count_nonzero(score0 < score1) + 0.5 * np.count_nonzero(score0 == score1)) / n
@@ -0,0 +1,153 @@
+# HULHE_env/evaluator.py
+
+import os
+import math
+import itertools
+import numpy as np
+from treys.lookup import LookupTable
+
+# 查找表布局: [同花表 (以13位rank掩码为下标) | 非同花表 (以rank计数的完美哈希为下标)]
+# 表中的值与treys完全一致: 1 = 皇家同花顺, 7462 = 最差的高牌，越小越强。
+NUM_RANKS = 13
+HAND_SIZE = 7
+FLUSH_TABLE_SIZE = 1 << NUM_RANKS
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+# treys的花色位 (s=1, h=2, d=4, c=8) -> cards.CARD_SUIT中的下标
+TREYS_SUIT_TO_INDEX = np.array([0, 0, 1, 0, 2, 0, 0, 0, 3], dtype=np.int64)
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'hand_rank_table.npy')
+
+def _build_hash_offsets():
+    """
+    rank计数向量 (c_0..c_12, 每项<=4, 总和为7) 的完美哈希。
+    OFFSETS[i, c, k]: 第i个rank出现c次、且剩余k张牌待分配时，对下标的贡献。
+    """
+    ways = np.zeros((NUM_RANKS + 1, HAND_SIZE + 1), dtype=np.int64)
+    ways[NUM_RANKS, 0] = 1
+    for i in range(NUM_RANKS - 1, -1, -1):
+        for k in range(HAND_SIZE + 1):
+            ways[i, k] = sum(ways[i + 1, k - c] for c in range(min(4, k) + 1))
+
+    offsets = np.zeros((NUM_RANKS, 5, HAND_SIZE + 1), dtype=np.int64)
+    for i in range(NUM_RANKS):
+        for k in range(HAND_SIZE + 1):
+            for c in range(1, 5):
+                offsets[i, c, k] = offsets[i, c - 1, k] + (ways[i + 1, k - c + 1] if k - c + 1 >= 0 else 0)
+    return offsets, int(ways[0, HAND_SIZE])
+
+HASH_OFFSETS, NUM_RANK_MULTISETS = _build_hash_offsets()
+_OFFSETS_LIST = HASH_OFFSETS.tolist()
+
+def _hash_rank_counts(counts):
+    index, remaining = 0, HAND_SIZE
+    for i, c in enumerate(counts):
+        if c:
+            index += _OFFSETS_LIST[i][c][remaining]
+            remaining -= c
+    return index
+
+def _rank_multisets(rank=0, remaining=HAND_SIZE, prefix=()):
+    if rank == NUM_RANKS:
+        if remaining == 0: yield prefix
+        return
+    for c in range(min(4, remaining) + 1):
+        yield from _rank_multisets(rank + 1, remaining - c, prefix + (c,))
+
+def build_rank_table():
+    """
+    利用treys的5张牌查找表，为所有7张牌的组合预计算最佳5张牌的rank。
+    """
+    lookup = LookupTable()
+    table = np.zeros(FLUSH_TABLE_SIZE + NUM_RANK_MULTISETS, dtype=np.int16)
+
+    # 1. 同花: 同一花色有5~7张牌，取其中最好的5张 (7张牌时同花不可能与四条/葫芦共存)
+    for mask in range(FLUSH_TABLE_SIZE):
+        ranks = [r for r in range(NUM_RANKS) if mask >> r & 1]
+        if not 5 <= len(ranks) <= HAND_SIZE: continue
+        table[mask] = min(lookup.flush_lookup[math.prod(PRIMES[r] for r in combo)]
+                          for combo in itertools.combinations(ranks, 5))
+
+    # 2. 非同花: 只取决于7张牌的rank多重集合
+    for counts in _rank_multisets():
+        ranks = [r for r, c in enumerate(counts) for _ in range(c)]
+        best = min(lookup.unsuited_lookup[math.prod(PRIMES[r] for r in combo)]
+                   for combo in itertools.combinations(ranks, 5))
+        table[FLUSH_TABLE_SIZE + _hash_rank_counts(counts)] = best
+    return table
+
+def load_rank_table(path=DEFAULT_TABLE_PATH):
+    """
+    加载(必要时生成并缓存到磁盘)查找表，以只读内存映射的方式返回。
+    """
+    if not os.path.exists(path):
+        table = build_rank_table()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f: np.save(f, table)
+            os.replace(tmp_path, path)
+        except OSError:
+            # 目录不可写时退化为仅驻留内存的表
+            return table
+    return np.load(path, mmap_mode='r')
+
+class HandEvaluator:
+    """
+    基于预计算查找表的7张牌评估器，可直接替换treys.Evaluator用于摊牌。
+    - evaluate(hand, board): 标量接口，参数为treys整数牌 (与treys.Evaluator签名一致)。
+    - evaluate_batch(cards): 批量接口，cards为(N, 7)的紧凑牌面下标 (见cards.py)。
+    返回值与treys一致，越小越强。
+    """
+    _shared_tables = {}
+
+    def __init__(self, table_path=DEFAULT_TABLE_PATH):
+        if table_path not in self._shared_tables:
+            self._shared_tables[table_path] = load_rank_table(table_path)
+        self.table = self._shared_tables[table_path]
+        self._flush_table = self.table[:FLUSH_TABLE_SIZE]
+        self._rank_table = self.table[FLUSH_TABLE_SIZE:]
+
+    def evaluate(self, hand, board):
+        rank_counts = [0] * NUM_RANKS
+        suit_counts = [0] * 16
+        suit_masks = [0] * 16
+        for c in hand + board:
+            rank, suit = (c >> 8) & 0xF, (c >> 12) & 0xF
+            rank_counts[rank] += 1
+            suit_counts[suit] += 1
+            suit_masks[suit] |= 1 << rank
+        for suit in (1, 2, 4, 8):
+            if suit_counts[suit] >= 5:
+                return int(self._flush_table[suit_masks[suit]])
+        return int(self._rank_table[_hash_rank_counts(rank_counts)])
+
+    def evaluate_batch(self, cards):
+        cards = np.asarray(cards, dtype=np.int64)
+        n = len(cards)
+        ranks = cards >> 2
+        suits = cards & 3
+        rows = np.arange(n)[:, None]
+
+        # 同花: 找出张数>=5的花色，并构造该花色的13位rank掩码
+        suit_counts = np.bincount((rows * 4 + suits).ravel(), minlength=4 * n).reshape(n, 4)
+        flush_suit = suit_counts.argmax(axis=1)
+        has_flush = suit_counts[np.arange(n), flush_suit] >= 5
+        flush_mask = np.where(suits == flush_suit[:, None], np.left_shift(1, ranks), 0).sum(axis=1)
+
+        # 非同花: rank计数向量的完美哈希
+        rank_counts = np.bincount((rows * NUM_RANKS + ranks).ravel(), minlength=NUM_RANKS * n).reshape(n, NUM_RANKS)
+        index = np.zeros(n, dtype=np.int64)
+        remaining = np.full(n, HAND_SIZE, dtype=np.int64)
+        for i in range(NUM_RANKS):
+            count = rank_counts[:, i]
+            index += HASH_OFFSETS[i, count, remaining]
+            remaining -= count
+
+        return np.where(has_flush, self._flush_table[flush_mask], self._rank_table[index])
+
+    def evaluate_batch_treys(self, hands, boards):
+        """
+        批量接口的treys整数牌版本: hands为(N, 2)，boards为(N, 5)。
+        """
+        cards = np.concatenate([np.asarray(hands), np.asarray(boards)], axis=1)
+        return self.evaluate_batch(((cards >> 8) & 0xF) * 4 + TREYS_SUIT_TO_INDEX[(cards >> 12) & 0xF])
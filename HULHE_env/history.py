@@ -0,0 +1,154 @@
+# HULHE_env/history.py
+
+import struct
+import numpy as np
+from treys import Card
+
+ROUNDS = ('preflop', 'flop', 'turn', 'river')
+# 历史记录中的动作编码 (前4个与environment.ACTIONS一致，另加盲注)
+HISTORY_ACTIONS = ('fold', 'check', 'call', 'raise', 'small_blind', 'big_blind')
+HISTORY_ACTION_INDEX = {a: i for i, a in enumerate(HISTORY_ACTIONS)}
+# 公共牌数量 -> street编码
+BOARD_SIZE_TO_STREET = {0: 0, 3: 1, 4: 2, 5: 3}
+STREET_BOARD_SIZE = (0, 3, 4, 5)
+
+# 每条记录44字节: street / player / action / 类型标志, 动作后的双方筹码、底池、双方本轮下注
+# 底池和下注在旧版字典中是int还是float取决于局中的运算 (例如标准化筹码下的All-in会使它们变为float)，
+# 因此逐条记录原值的类型: FLOAT_POT / FLOAT_BET0 / FLOAT_BET1 位
+RECORD_DTYPE = np.dtype([
+    ('street', 'i1'), ('player', 'i1'), ('action', 'i1'), ('float_flags', 'i1'),
+    ('stacks', 'f8', (2,)), ('pot', 'f8'), ('bets', 'f8', (2,)),
+])
+_RECORD_STRUCT = struct.Struct('<bbbbddddd')
+FLOAT_POT, FLOAT_BET0, FLOAT_BET1 = 1, 2, 4
+assert _RECORD_STRUCT.size == RECORD_DTYPE.itemsize
+
+class ActionHistory:
+    """
+    一局牌的动作历史，保存在预分配的定长记录数组中 (records[:length] 有效)。
+    encoder和logger可以直接读取 streets / players / actions / stacks / pots / bets 等数组视图；
+    迭代、下标和切片访问则按需生成与旧版 action_history 相同的嵌套字典，以保持兼容。
+    """
+    def __init__(self, board=None, capacity=32, float_stacks=False):
+        self.records = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self._buffer = memoryview(self.records.view(np.uint8))
+        self.length = 0
+        # 与环境共享的公共牌列表 (treys整数)，用于还原每个动作时可见的公共牌
+        self.board = board if board is not None else []
+        # 旧版字典中筹码的类型取决于初始筹码 (随机模式为int，标准化模式为float)
+        self.float_stacks = float_stacks
+
+    def append(self, street, player, action, stack0, stack1, pot, bet0, bet1):
+        if self.length == len(self.records): self._grow()
+        flags = (FLOAT_POT if type(pot) is float else 0) | (FLOAT_BET0 if type(bet0) is float else 0) | \
+                (FLOAT_BET1 if type(bet1) is float else 0)
+        _RECORD_STRUCT.pack_into(self._buffer, self.length * RECORD_DTYPE.itemsize,
+                                 street, player, action, flags, stack0, stack1, pot, bet0, bet1)
+        self.length += 1
+
+    def _grow(self):
+        records = np.zeros(2 * len(self.records), dtype=RECORD_DTYPE)
+        records[:self.length] = self.records[:self.length]
+        self.records = records
+        self._buffer = memoryview(self.records.view(np.uint8))
+
+    # --- 数组访问器 (只读视图) ---
+    @property
+    def streets(self):
+        return self.records['street'][:self.length]
+
+    @property
+    def players(self):
+        return self.records['player'][:self.length]
+
+    @property
+    def actions(self):
+        return self.records['action'][:self.length]
+
+    @property
+    def stacks(self):
+        return self.records['stacks'][:self.length]
+
+    @property
+    def pots(self):
+        return self.records['pot'][:self.length]
+
+    @property
+    def bets(self):
+        return self.records['bets'][:self.length]
+
+    def community_cards_at(self, index):
+        return [Card.int_to_str(c) for c in self.board[:STREET_BOARD_SIZE[self.records['street'][index]]]]
+
+    # --- 序列化 ---
+    def tobytes(self):
+        """
+        一次缓冲区复制即可序列化整局历史 (不含公共牌)。
+        """
+        return self.records[:self.length].tobytes()
+
+    @classmethod
+    def frombytes(cls, data, board=None, float_stacks=False):
+        length = len(data) // RECORD_DTYPE.itemsize
+        history = cls(board, capacity=max(length, 32), float_stacks=float_stacks)
+        history._buffer[:len(data)] = data
+        history.length = length
+        return history
+
+    # memoryview不能被pickle/deepcopy，序列化时丢弃并在恢复时重建
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_buffer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buffer = memoryview(self.records.view(np.uint8))
+
+    # --- 旧版字典形式 ---
+    def _stack(self, value):
+        return value if self.float_stacks else int(value)
+
+    def row(self, index):
+        """
+        返回第index条记录 (round, player, action, stacks, pot, bets)，数值类型与旧版字典一致。
+        """
+        if index < 0: index += self.length
+        if not 0 <= index < self.length: raise IndexError(index)
+        street, player, action, flags, s0, s1, pot, b0, b1 = _RECORD_STRUCT.unpack_from(self._buffer, index * RECORD_DTYPE.itemsize)
+        stacks = [self._stack(s0), self._stack(s1)]
+        bets = [b0 if flags & FLOAT_BET0 else int(b0), b1 if flags & FLOAT_BET1 else int(b1)]
+        return ROUNDS[street], player, HISTORY_ACTIONS[action], stacks, pot if flags & FLOAT_POT else int(pot), bets
+
+    def raw_row(self, index):
+        """
+        返回未经类型转换的原始记录元组 (street, player, action, float_flags, stack0, stack1, pot, bet0, bet1)。
+        """
+        return _RECORD_STRUCT.unpack_from(self._buffer, index * RECORD_DTYPE.itemsize)
+
+    def entry(self, index):
+        action_round, player, action, stacks, pot, bets = self.row(index)
+        return {
+            'round': action_round,
+            'player': player,
+            'action': action,
+            'state_after_action': {
+                'players': [{'stack': stacks[i], 'current_bet': bets[i]} for i in range(2)],
+                'pot': pot,
+                'community_cards': self.community_cards_at(index),
+                'numeric_state': {'stacks': list(stacks), 'pot': pot},
+            },
+        }
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice): return [self.entry(i) for i in range(*key.indices(self.length))]
+        return self.entry(key)
+
+    def __iter__(self):
+        for i in range(self.length): yield self.entry(i)
+
+    def to_list(self):
+        return list(self)
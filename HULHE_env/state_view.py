@@ -0,0 +1,58 @@
+# HULHE_env/state_view.py
+
+from collections.abc import Mapping
+
+# 每个键对应一个按需读取环境状态的函数，只有被访问时才会构造列表/字典或把牌转换成字符串
+_GETTERS = {
+    'community_cards': lambda env: env._community_card_strs(),
+    'pot': lambda env: env.pot,
+    'button_player': lambda env: env.button_player,
+    'current_player': lambda env: env.current_player,
+    'players': lambda env: [{'stack': p['stack'], 'current_bet': p['current_bet']} for p in env.players],
+    'action_history': lambda env: env.action_history,
+    'done': lambda env: env.done,
+    'winner_info': lambda env: env.winner_info,
+    'full_info': lambda env: {'hands': env._hand_strs()},
+}
+
+class StateView(Mapping):
+    """
+    PokerEnv状态的只读视图，提供与旧版_get_state()字典完全相同的键。
+    视图不复制任何数据: 每个键在被访问时才从环境中读取，牌在内部保持treys整数，
+    只有访问community_cards / full_info时才转换为字符串 (并按街缓存)。
+    视图反映环境的“当前”状态；如需在环境继续推进后保留某一时刻的状态，请调用to_dict()。
+    """
+    __slots__ = ('_env',)
+
+    def __init__(self, env):
+        self._env = env
+
+    def __getitem__(self, key):
+        try:
+            getter = _GETTERS[key]
+        except KeyError:
+            raise KeyError(key) from None
+        return getter(self._env)
+
+    def __iter__(self):
+        return iter(_GETTERS)
+
+    def __len__(self):
+        return len(_GETTERS)
+
+    def __repr__(self):
+        return f"StateView({self.to_dict()!r})"
+
+    @property
+    def community_card_ints(self):
+        return self._env.community_cards
+
+    @property
+    def hand_ints(self):
+        return [p['hand'] for p in self._env.players]
+
+    def to_dict(self):
+        """
+        返回与旧版_get_state()相同的独立字典。
+        """
+        return {key: getter(self._env) for key, getter in _GETTERS.items()}
@@ -0,0 +1,277 @@
+# HULHE_env/vec_env.py
+
+import numpy as np
+
+from HULHE_env.environment import PokerEnv, ACTIONS
+from HULHE_env.evaluator import HandEvaluator
+from HULHE_env.equity import EquityCalculator
+from HULHE_env.dealer import Dealer, BOARD_SLOT, env_rng, equity_seed
+from HULHE_env.betting_table import (FOLD, CALL, RAISE, PREFLOP_START, PREFLOP_START_BB_ALL_IN, PREFLOP_START_BB_SHORT,
+                                     POSTFLOP_START, OUTCOME_NORMAL, OUTCOME_ALL_IN, OUTCOME_ALL_IN_SHORT, LEGAL_BOOL, NEXT_STATE,
+                                     ROUND_OVER, STATE_RAISES, STATE_CAPPED, STATE_LR_OPP)
+
+REASONS = ('fold', 'showdown')
+REASON_FOLD, REASON_SHOWDOWN = range(2)
+
+# cards数组的列布局与Dealer的发牌记录相同: [P0手牌x2, P1手牌x2, 公共牌x5]
+# 每个street (preflop/flop/turn/river) 已发出的公共牌数量
+STREET_BOARD_SIZE = np.array([0, 3, 4, 5], dtype=np.int8)
+# 每个street下cards中已公开的列 (未发出的公共牌在状态中记为-1，agent看不到后续的发牌)
+VISIBLE_SLOTS = np.arange(9) < BOARD_SLOT + STREET_BOARD_SIZE[:, None]
+
+class VecPokerEnv:
+    """
+    同时模拟N张牌桌的向量化HULHE环境 (struct-of-arrays)。
+    所有牌桌的筹码、下注、底池、加注次数、封顶标记、庄家、street和牌面都保存在
+    NumPy数组中，一次step(actions)即推进全部牌桌。合法动作和下注轮的推进与PokerEnv一样由
+    betting_table的转移表批量查表得到 (不完整All-in加注、下注封顶、_handle_all_in_settlement中的退款)。
+    已结束的牌桌会被自动重置，该局的结果通过step返回的winner_info给出。
+    """
+    RAISE_LIMIT = PokerEnv.RAISE_LIMIT
+
+    def __init__(self, num_tables, initial_total_stack=400, big_blind=2, randomize_stacks=True, seed=None,
+                 allin_ev=False, equity_calculator=None, dealer=None):
+        self.num_tables = num_tables
+        self.initial_total_stack = initial_total_stack
+        self.big_blind = big_blind
+        self.small_blind = big_blind // 2
+        self.small_bet = self.big_blind
+        self.big_bet = 2 * self.big_blind
+        self.randomize_stacks = randomize_stacks
+        # 与PokerEnv相同: 发牌与随机筹码来自dealer (按重置顺序批量取用)，初始庄家来自独立的随机数流
+        self.dealer = dealer or Dealer(seed)
+        # 回放保存的发牌流时沿用其记录的种子，使初始庄家等与原运行一致
+        if seed is None and dealer is not None: seed = dealer.seed
+        self.rng = env_rng(seed)
+        self.evaluator = HandEvaluator()
+        # allin_ev: 与PokerEnv相同，winner_info中额外给出按胜率分配底池的'ev_results'
+        self.allin_ev = allin_ev
+        if allin_ev and equity_calculator is None: equity_calculator = EquityCalculator(self.evaluator, seed=equity_seed(seed))
+        self.equity_calculator = equity_calculator
+
+        n = num_tables
+        self._tables = np.arange(n)
+        self.stacks = np.zeros((n, 2))
+        self.current_bets = np.zeros((n, 2))
+        self.initial_stacks = np.zeros((n, 2))
+        self.is_all_in = np.zeros((n, 2), dtype=bool)
+        self.pot = np.zeros(n)
+        self.current_bet = np.zeros(n)
+        self.betting_state = np.full(n, PREFLOP_START, dtype=np.int16)
+        self.current_player = np.zeros(n, dtype=np.int8)
+        self.button_player = self.rng.integers(0, 2, size=n).astype(np.int8)
+        self.street = np.zeros(n, dtype=np.int8)
+        self.cards = np.zeros((n, 9), dtype=np.int8)
+        self._visible_cards = np.zeros((n, 9), dtype=np.int8)
+        self.legal_mask = np.zeros((n, len(ACTIONS)), dtype=bool)
+
+    def reset(self):
+        self._reset_tables(np.ones(self.num_tables, dtype=bool))
+        self._update_legal_mask()
+        return self._get_state()
+
+    def step(self, actions):
+        """
+        为每张牌桌执行一个动作 (ACTIONS中的整数编码)。
+        返回 (state, done, winner_info)：done[i]为True表示牌桌i刚刚结束一局，
+        winner_info中对应行给出该局的 winner / pot / reason / results (allin_ev模式下另有ev_results)，
+        而state中该牌桌已经是自动重置后的新一局。
+        """
+        n, tables = self.num_tables, self._tables
+        actions = np.asarray(actions, dtype=np.int64)
+        illegal = ~self.legal_mask[tables, actions]
+        if illegal.any():
+            t = int(np.flatnonzero(illegal)[0])
+            raise ValueError(f"Illegal action '{ACTIONS[actions[t]]}' for Player {self.current_player[t]} at table {t}.")
+
+        player = self.current_player.astype(np.int64)
+        opp = 1 - player
+        fold = actions == FOLD
+        call = actions == CALL
+        raise_ = actions == RAISE
+
+        # 1. Call / Raise 的下注金额 (与PokerEnv._handle_call/_handle_raise一致)
+        bet_size = np.where(self.street <= 1, self.small_bet, self.big_bet)
+        amount_to_call = self.current_bet - self.current_bets[tables, player]
+        amount = np.where(call, amount_to_call, 0) + np.where(raise_, amount_to_call + bet_size, 0)
+        paying = call | raise_
+        actual = np.zeros(n)
+        actual[paying] = self._player_bet(tables[paying], player[paying], amount[paying])
+
+        # 2. 下注结果: 普通 / 因此All-in / 不完整的All-in加注
+        actor_all_in = self.is_all_in[tables, player]
+        outcome = np.where(actor_all_in, np.where(raise_ & (actual < amount), OUTCOME_ALL_IN_SHORT, OUTCOME_ALL_IN), OUTCOME_NORMAL)
+        self.current_bet = np.where(raise_, self.current_bets[tables, player], self.current_bet)
+        self.current_player = np.where(fold, player, opp).astype(np.int8)
+
+        done = np.zeros(n, dtype=bool)
+        winner_info = {
+            'winner': np.full(n, -1, dtype=np.int8),
+            'pot': np.zeros(n),
+            'reason': np.zeros(n, dtype=np.int8),
+            'results': np.zeros((n, 2)),
+        }
+        if self.allin_ev: winner_info['ev_results'] = np.zeros((n, 2))
+
+        # 3. Fold
+        if fold.any():
+            rows = tables[fold]
+            self.stacks[rows, opp[fold]] += self.pot[rows]
+            self._finalize_hands(rows, opp[fold], REASON_FOLD, winner_info)
+            done |= fold
+
+        # 4. 查转移表: 下注轮是否结束，以及对手面对的新下注状态
+        over = ROUND_OVER[self.betting_state, actions, outcome] & ~fold
+        self.betting_state = np.where(over | fold, self.betting_state, NEXT_STATE[self.betting_state, actions, outcome])
+
+        if over.any():
+            any_all_in = self.is_all_in.any(axis=1)
+            self._handle_all_in_settlement(over & any_all_in)
+            if self.allin_ev:
+                runout_rows = tables[over & any_all_in]
+                ev_results = self._allin_ev_results(runout_rows)
+            showdown = self._end_betting_round(over, any_all_in)
+            if showdown.any():
+                self._showdown(tables[showdown], winner_info)
+                done |= showdown
+            if self.allin_ev: winner_info['ev_results'][runout_rows] = ev_results
+
+        if done.any():
+            self._reset_tables(done)
+        self._update_legal_mask()
+        return self._get_state(), done, winner_info
+
+    def _update_legal_mask(self):
+        """
+        批量计算所有牌桌当前玩家的合法动作掩码 (列顺序同ACTIONS)。
+        """
+        tables, player = self._tables, self.current_player
+        affordable = self.stacks[tables, player] > self.current_bet - self.current_bets[tables, player]
+        self.legal_mask[:] = LEGAL_BOOL[self.betting_state, affordable.astype(np.int64)]
+
+    # 以下字段由下注状态推导 (只读)，与PokerEnv的同名属性一致
+    @property
+    def raises_this_round(self):
+        return STATE_RAISES[self.betting_state]
+
+    @property
+    def is_betting_capped(self):
+        return STATE_CAPPED[self.betting_state].astype(bool)
+
+    @property
+    def last_raiser(self):
+        return np.where(STATE_LR_OPP[self.betting_state] == 1, 1 - self.current_player, self.current_player).astype(np.int8)
+
+    def _player_bet(self, rows, players, amounts):
+        bet_amount = np.minimum(amounts, self.stacks[rows, players])
+        self.stacks[rows, players] -= bet_amount
+        self.current_bets[rows, players] += bet_amount
+        self.pot[rows] += bet_amount
+        self.is_all_in[rows, players] |= self.stacks[rows, players] == 0
+        return bet_amount
+
+    def _handle_all_in_settlement(self, mask):
+        # 下注较多的一方退还超出对手的部分
+        diff = np.where(mask, self.current_bets[:, 0] - self.current_bets[:, 1], 0)
+        refund0, refund1 = np.maximum(diff, 0), np.maximum(-diff, 0)
+        self.stacks[:, 0] += refund0
+        self.stacks[:, 1] += refund1
+        self.current_bets[:, 0] -= refund0
+        self.current_bets[:, 1] -= refund1
+        self.pot -= refund0 + refund1
+
+    def _end_betting_round(self, over, any_all_in):
+        """
+        结束over中的牌桌的下注轮，返回需要摊牌的牌桌掩码。
+        """
+        self.current_bets[over] = 0
+        self.current_bet[over] = 0
+        self.betting_state[over] = POSTFLOP_START
+        bb_idx = (1 - self.button_player).astype(np.int8)
+        self.current_player = np.where(over, bb_idx, self.current_player)
+
+        # 有人All-in时直接发完公共牌并摊牌；否则进入下一street，河牌结束后摊牌
+        runout = over & any_all_in
+        showdown = runout | (over & (self.street == 3))
+        self.street[over & ~showdown] += 1
+        self.street[runout] = 3
+        return showdown
+
+    def _showdown(self, rows, winner_info):
+        cards = self.cards[rows]
+        board = cards[:, BOARD_SLOT:]
+        score0 = self.evaluator.evaluate_batch(np.concatenate([cards[:, 0:2], board], axis=1))
+        score1 = self.evaluator.evaluate_batch(np.concatenate([cards[:, 2:4], board], axis=1))
+        winners = np.where(score0 < score1, 0, np.where(score1 < score0, 1, -1)).astype(np.int8)
+
+        win = winners >= 0
+        self.stacks[rows[win], winners[win]] += self.pot[rows[win]]
+        tie = rows[~win]
+        self.stacks[tie] += (self.pot[tie] / 2)[:, None]
+        self._finalize_hands(rows, winners, REASON_SHOWDOWN, winner_info)
+
+    def _finalize_hands(self, rows, winners, reason, winner_info):
+        winner_info['winner'][rows] = winners
+        winner_info['pot'][rows] = self.pot[rows]
+        winner_info['reason'][rows] = reason
+        winner_info['results'][rows] = self.stacks[rows] - self.initial_stacks[rows]
+        if self.allin_ev: winner_info['ev_results'][rows] = winner_info['results'][rows]
+
+    def _allin_ev_results(self, rows):
+        """
+        在发出剩余公共牌之前 (street尚未推进)，按双方胜率分配底池得到的期望净输赢。
+        """
+        equity0 = np.array([self.equity_calculator.equity(cards[0:2], cards[2:4], cards[BOARD_SLOT:BOARD_SLOT + STREET_BOARD_SIZE[street]])
+                            for cards, street in zip(self.cards[rows].tolist(), self.street[rows])])
+        shares = np.stack([equity0, 1 - equity0], axis=1) if len(rows) else np.zeros((0, 2))
+        return self.stacks[rows] + shares * self.pot[rows, None] - self.initial_stacks[rows]
+
+    def _reset_tables(self, mask):
+        rows = np.flatnonzero(mask)
+        count = len(rows)
+        self.button_player[rows] = 1 - self.button_player[rows]
+        cards, p0_stack = self.dealer.deal_batch(count)
+        self.cards[rows] = cards
+
+        if self.randomize_stacks:
+            self.stacks[rows, 0] = p0_stack
+            self.stacks[rows, 1] = self.initial_total_stack - p0_stack
+        else:
+            self.stacks[rows] = self.initial_total_stack / 2
+
+        self.current_bets[rows] = 0
+        self.is_all_in[rows] = False
+        self.initial_stacks[rows] = self.stacks[rows]
+        self.pot[rows] = 0
+        self.street[rows] = 0
+
+        # 盲注
+        sb_idx = self.button_player[rows].astype(np.int64)
+        bb_idx = 1 - sb_idx
+        self._player_bet(rows, sb_idx, np.full(count, self.small_blind))
+        self._player_bet(rows, bb_idx, np.full(count, self.big_blind))
+        self.current_bet[rows] = self.big_blind
+        bb_all_in = self.is_all_in[rows, bb_idx]
+        bb_short = bb_all_in & (self.current_bets[rows, bb_idx] < self.big_blind)
+        self.betting_state[rows] = np.where(bb_short, PREFLOP_START_BB_SHORT,
+                                            np.where(bb_all_in, PREFLOP_START_BB_ALL_IN, PREFLOP_START))
+        self.current_player[rows] = sb_idx
+
+    def _get_state(self):
+        """
+        返回所有牌桌的批量状态。数组为环境内部缓冲区的引用，仅在下一次step前有效，调用方不得修改。
+        cards中尚未发出的公共牌为-1。
+        """
+        np.copyto(self._visible_cards, self.cards)
+        self._visible_cards[~VISIBLE_SLOTS[self.street]] = -1
+        return {
+            'cards': self._visible_cards,
+            'street': self.street,
+            'num_community_cards': STREET_BOARD_SIZE[self.street],
+            'pot': self.pot,
+            'button_player': self.button_player,
+            'current_player': self.current_player,
+            'stacks': self.stacks,
+            'current_bets': self.current_bets,
+            'legal_mask': self.legal_mask,
+        }
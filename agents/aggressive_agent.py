@@ -1,5 +1,6 @@
 # agents/aggressive_agent.py
 
+import numpy as np
 from agents.base_agent import BaseAgent
 
 class AggressiveAgent(BaseAgent):
@@ -24,4 +25,13 @@ class AggressiveAgent(BaseAgent):
         elif 'check' in legal_actions:
             return 'check'
         else:
-            return 'fold'
\ No newline at end of file
+            return 'fold'
+
+    def act_batch(self, states, legal_masks):
+        """
+        向量化版本: ACTIONS的顺序 (fold, check, call, raise) 恰好是优先级从低到高，
+        因此选择下标最大的合法动作。
+        """
+        legal_masks = np.asarray(legal_masks, dtype=bool)
+        num_actions = legal_masks.shape[1]
+        return num_actions - 1 - np.argmax(legal_masks[:, ::-1], axis=1)
@@ -1,15 +1,32 @@
 # agents/base_agent.py
 
 from abc import ABC, abstractmethod
+import numpy as np
+
+from HULHE_env.environment import ACTIONS
 
 class BaseAgent(ABC):
     """
     所有AI智能体的抽象基类 (合同)。
-    它规定所有Agent都必须实现一个`act`方法。
+    它规定所有Agent都必须实现一个`act`方法；`act_batch`为同时做出多个决策的批量接口，
+    默认逐个调用act，需要批量推理的Agent (如神经网络) 应覆盖它。
     """
     def __init__(self, name):
         self.name = name
 
     @abstractmethod
     def act(self, state, legal_actions):
-        pass
\ No newline at end of file
+        pass
+
+    def act_batch(self, states, legal_masks):
+        """
+        为N个待决策的状态各选择一个动作。
+        states为长度N的状态序列，legal_masks为(N, 4)的布尔数组 (列顺序同ACTIONS)。
+        返回(N,)的int64动作下标 (ACTIONS中的编码)。
+        """
+        legal_masks = np.asarray(legal_masks, dtype=bool)
+        actions = np.empty(len(legal_masks), dtype=np.int64)
+        for i, (state, mask) in enumerate(zip(states, legal_masks)):
+            legal_actions = [a for a, legal in zip(ACTIONS, mask) if legal]
+            actions[i] = ACTIONS.index(self.act(state, legal_actions))
+        return actions
@@ -1,14 +1,28 @@
 # agents/random_agent.py
 
 import random
+import numpy as np
 from agents.base_agent import BaseAgent
 
 class RandomAgent(BaseAgent):
     """
     一个只会从合法动作中随机选择的智能体，用于测试和基准。
     """
-    def __init__(self, name="RandomBot"):
+    def __init__(self, name="RandomBot", seed=None):
         super().__init__(name)
+        self.rng = random.Random(seed)
+        # act_batch使用独立的NumPy随机数流，不影响act的序列
+        self.np_rng = np.random.default_rng(seed)
 
     def act(self, state, legal_actions):
-        return random.choice(legal_actions)
\ No newline at end of file
+        return self.rng.choice(legal_actions)
+
+    def act_batch(self, states, legal_masks):
+        """
+        向量化版本: 每行在合法动作中均匀随机选择一个。
+        """
+        legal_masks = np.asarray(legal_masks, dtype=bool)
+        counts = legal_masks.sum(axis=1)
+        # 选第k个合法动作 (k在[0, count)内均匀分布): 即累计合法数首次超过k的列
+        k = (self.np_rng.random(len(legal_masks)) * counts).astype(np.int64)
+        return np.argmax(np.cumsum(legal_masks, axis=1) > k[:, None], axis=1)
@@ -0,0 +1,7 @@
+# agents/registry.py
+
+from agents.random_agent import RandomAgent
+from agents.aggressive_agent import AggressiveAgent
+
+# 命令行与基准中按名字选择的内置Agent
+AGENTS = {'random': RandomAgent, 'aggressive': AggressiveAgent}
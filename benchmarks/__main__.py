@@ -0,0 +1,89 @@
+# benchmarks/__main__.py
+#
+# 用法:
+#   python -m benchmarks run [--output bench.json] [--scale 1.0] [--only env. encoder.]
+#   python -m benchmarks compare baseline.json bench.json [--tolerance 0.1]
+
+import sys
+import json
+import platform
+import argparse
+import datetime
+import numpy as np
+
+from benchmarks.suite import BENCHMARKS, run_suite, max_rss_kb
+
+def cmd_run(args):
+    names = [n for n in BENCHMARKS if not args.only or any(n.startswith(p) for p in args.only)]
+    print(f"Running {len(names)} benchmarks (scale={args.scale})...")
+    results = run_suite(names, scale=args.scale)
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'max_rss_kb': max_rss_kb(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+def compare(baseline, current, tolerance):
+    """
+    对比两份结果，返回 (行列表, 是否有回退)。吞吐量下降超过tolerance或峰值内存上升超过tolerance视为回退。
+    基线中缺少吞吐量或吞吐量为0的基准无法对比，标记为n/a且不算回退。
+    """
+    rows, regressed = [], False
+    for name, cur in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            rows.append((name, None, cur['throughput'], None, 'new'))
+            continue
+        if not base.get('throughput'):
+            rows.append((name, None, cur['throughput'], None, 'n/a'))
+            continue
+        ratio = cur['throughput'] / base['throughput']
+        flags = []
+        if ratio < 1 - tolerance: flags.append('SLOWER')
+        if 'peak_memory_kb' in base and cur['peak_memory_kb'] > base['peak_memory_kb'] * (1 + tolerance):
+            flags.append('MORE MEMORY')
+        regressed |= bool(flags)
+        rows.append((name, base['throughput'], cur['throughput'], ratio, ', '.join(flags) or 'ok'))
+    return rows, regressed
+
+def cmd_compare(args):
+    with open(args.baseline) as f: baseline = json.load(f)
+    with open(args.current) as f: current = json.load(f)
+    rows, regressed = compare(baseline, current, args.tolerance)
+    print(f"{'benchmark':<40} {'baseline':>14} {'current':>14} {'ratio':>7}  status")
+    for name, base, cur, ratio, status in rows:
+        placeholder = 'n/a' if status == 'n/a' else '-'
+        base_str = f"{base:,.0f}" if base is not None else placeholder
+        ratio_str = f"{ratio:.2f}" if ratio is not None else placeholder
+        print(f"{name:<40} {base_str:>14} {cur:>14,.0f} {ratio_str:>7}  {status}")
+    if regressed: print(f"\nRegressions detected (tolerance {args.tolerance:.0%}).")
+    return 1 if regressed else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='PokerAI throughput benchmarks.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='run the benchmark suite and write results to JSON')
+    run.add_argument('--output', default='bench.json')
+    run.add_argument('--scale', type=float, default=1.0, help='multiplier for the amount of work per benchmark')
+    run.add_argument('--only', nargs='*', help='only run benchmarks whose name starts with one of these prefixes')
+    run.set_defaults(func=cmd_run)
+    cmp_ = sub.add_parser('compare', help='flag regressions of a result file against a stored baseline')
+    cmp_.add_argument('baseline')
+    cmp_.add_argument('current')
+    cmp_.add_argument('--tolerance', type=float, default=0.10)
+    cmp_.set_defaults(func=cmd_compare)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# benchmarks/suite.py
+
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+
+from HULHE_env.environment import PokerEnv
+from HULHE_env.evaluator import HandEvaluator
+from HULHE_env.dealer import Dealer
+from HULHE_env.cards import INDEX_TO_TREYS
+from agents.random_agent import RandomAgent
+from agents.registry import AGENTS
+from utils.encoder import encode_state_to_psv
+from utils.logger import GameLogger
+from utils.batch_driver import BatchDriver
+
+def _agents(agent_name, seed=0):
+    """
+    两个座位的agent。RandomAgent使用自己的随机数流，必须显式给定种子，每次运行的工作量才相同。
+    """
+    if agent_name == 'random': return [RandomAgent(name=f"random_{i}", seed=seed + i) for i in range(2)]
+    return [AGENTS[agent_name](name=f"{agent_name}_{i}") for i in range(2)]
+
+def _play(env, agents, num_hands, randomize_stacks):
+    states = []
+    for _ in range(num_hands):
+        state = env.reset(randomize_stacks=randomize_stacks)
+        while not state['done']:
+            state = env.step(agents[state['current_player']].act(state, env.get_legal_actions()))
+        states.append(state)
+    return states
+
+def _final_states(num_hands, seed=0):
+    """
+    生成一批已结束牌局的独立状态字典，供encoder和logger基准使用。
+    """
+    env = PokerEnv(seed=seed)
+    agents = [RandomAgent(seed=seed), RandomAgent(seed=seed + 1)]
+    states = []
+    for _ in range(num_hands):
+        state = _play(env, agents, 1, True)[0]
+        states.append(state.to_dict())
+    return states
+
+def bench_env(agent_name, randomize_stacks):
+    def run(scale):
+        num_hands = int(20000 * scale)
+        env = PokerEnv(seed=0)
+        agents = _agents(agent_name)
+        start = time.perf_counter()
+        _play(env, agents, num_hands, randomize_stacks)
+        return num_hands, time.perf_counter() - start
+    return run
+
+def bench_batch_driver(agent_name, num_tables=256):
+    def run(scale):
+        num_hands = int(20000 * scale)
+        envs = [PokerEnv(seed=i) for i in range(num_tables)]
+        agents = _agents(agent_name)
+        start = time.perf_counter()
+        BatchDriver(envs, agents).run(num_hands)
+        return num_hands, time.perf_counter() - start
+    return run
+
+def bench_encoder(scale):
+    states = _final_states(500)
+    calls = int(20000 * scale)
+    start = time.perf_counter()
+    for i in range(calls):
+        encode_state_to_psv(states[i % len(states)], i % 2)
+    return calls, time.perf_counter() - start
+
+def bench_showdown_scalar(scale):
+    rng = np.random.default_rng(0)
+    cards = INDEX_TO_TREYS[np.argsort(rng.random((int(100000 * scale), 52)), axis=1)[:, :7]].tolist()
+    evaluator = HandEvaluator()
+    start = time.perf_counter()
+    for c in cards:
+        evaluator.evaluate(c[:2], c[2:])
+    return len(cards), time.perf_counter() - start
+
+def bench_showdown_batch(scale):
+    rng = np.random.default_rng(0)
+    cards = np.argsort(rng.random((int(200000 * scale), 52)), axis=1)[:, :7]
+    evaluator = HandEvaluator()
+    start = time.perf_counter()
+    for chunk in np.array_split(cards, 20):
+        evaluator.evaluate_batch(chunk)
+    return len(cards), time.perf_counter() - start
+
+def bench_dealer(scale):
+    deals = int(1000000 * scale)
+    dealer = Dealer(seed=0)
+    start = time.perf_counter()
+    for _ in range(20):
+        dealer.deal_batch(deals // 20)
+    return deals, time.perf_counter() - start
+
+def bench_logger(data_format):
+    def run(scale):
+        states = _final_states(200)
+        psvs = [encode_state_to_psv(s, 0) for s in states]
+        rows = int(20000 * scale)
+        with tempfile.TemporaryDirectory() as tmp:
+            logger = GameLogger(base_log_dir=tmp, data_format=data_format)
+            start = time.perf_counter()
+            for i in range(rows):
+                logger.log_vectorized(psvs[i % len(psvs)], 1.0)
+            logger.close()
+            return rows, time.perf_counter() - start
+    return run
+
+def bench_logger_human(scale):
+    states = _final_states(200)
+    hands = int(5000 * scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        logger = GameLogger(base_log_dir=tmp)
+        start = time.perf_counter()
+        for i in range(hands):
+            logger.log_human_readable(states[i % len(states)], i + 1)
+        logger.close()
+        return hands, time.perf_counter() - start
+
+# 名称 -> (基准函数, 吞吐量单位)
+BENCHMARKS = {}
+for _agent in AGENTS:
+    for _randomize in (True, False):
+        BENCHMARKS[f"env.{_agent}.{'random_stacks' if _randomize else 'fixed_stacks'}"] = (bench_env(_agent, _randomize), 'hands/sec')
+for _agent in AGENTS:
+    BENCHMARKS[f"batch_driver.{_agent}"] = (bench_batch_driver(_agent), 'hands/sec')
+BENCHMARKS['encoder.encode_state_to_psv'] = (bench_encoder, 'calls/sec')
+BENCHMARKS['evaluator.scalar'] = (bench_showdown_scalar, 'evals/sec')
+BENCHMARKS['evaluator.batch'] = (bench_showdown_batch, 'evals/sec')
+BENCHMARKS['dealer.deal_batch'] = (bench_dealer, 'deals/sec')
+for _format in ('csv', 'npy', 'npy_compact'):
+    BENCHMARKS[f"logger.vectorized.{_format}"] = (bench_logger(_format), 'rows/sec')
+BENCHMARKS['logger.human_readable'] = (bench_logger_human, 'hands/sec')
+
+def run_benchmark(name, scale=1.0, memory_scale=0.1):
+    """
+    运行单个基准。吞吐量在不开启tracemalloc的情况下测量；峰值内存在缩小规模的第二遍中用tracemalloc测量。
+    """
+    func, unit = BENCHMARKS[name]
+    units, elapsed = func(scale)
+    tracemalloc.start()
+    func(scale * memory_scale)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'throughput': units / elapsed, 'unit': unit, 'elapsed': elapsed, 'peak_memory_kb': peak / 1024}
+
+def run_suite(names=None, scale=1.0, verbose=True):
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = run_benchmark(name, scale)
+        if verbose:
+            r = results[name]
+            print(f"  {name:<40} {r['throughput']:>14,.0f} {r['unit']:<10} peak {r['peak_memory_kb']:>10,.0f} KB")
+    return results
+
+def max_rss_kb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
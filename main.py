@@ -1,59 +1,60 @@
 # main.py
 
+import os
 from HULHE_env.environment import PokerEnv
 # from agents.random_agent import RandomAgent
 from agents.aggressive_agent import AggressiveAgent
-from utils.encoder import encode_state_to_psv
 from utils.logger import GameLogger
+from utils.parallel_runner import play_hands, run_parallel, instrument
+from utils.encoder import encode_state_to_psv
+from utils.profiler import Profiler
+
+def make_agents(seed=None):
+    # return [RandomAgent("Bot_A", seed=seed), RandomAgent("Bot_B", seed=None if seed is None else seed + 1)]
+    return [AggressiveAgent("Bot_A"), AggressiveAgent("Bot_B")]
+
+def main(num_hands=100, randomize_stacks=True, data_format='csv', num_workers=None, seed=None,
+         async_logging=False, human_log_every=1, profile=False, profile_every=1000, allin_ev=False, hand_history='text'):
+    if num_workers is not None:
+        # 多进程模式: 输出只取决于seed，与num_workers无关
+        return run_parallel(num_hands, num_workers=num_workers, master_seed=seed, randomize_stacks=randomize_stacks,
+                            data_format=data_format, agent_factory=make_agents,
+                            async_logging=async_logging, human_log_every=human_log_every, profile=profile,
+                            allin_ev=allin_ev, hand_history=hand_history)
 
-def main(num_hands=100, randomize_stacks=True):
     print("Initializing Poker AI Simulation...")
-    env = PokerEnv()
-    # agents = [RandomAgent("Bot_A"), RandomAgent("Bot_B")]
-    agents = [AggressiveAgent("Bot_A"), AggressiveAgent("Bot_B")]
-    logger = GameLogger()
+    # allin_ev: 训练标签使用All-in时按胜率计算的期望输赢，而不是单次随机发牌的实际结果
+    env = PokerEnv(seed=seed, allin_ev=allin_ev)
+    agents = make_agents(seed)
+    # hand_history='binary': 手牌历史写入紧凑的hands.bin，用 python -m utils.hand_history 按需渲染
+    logger = GameLogger(data_format=data_format, async_mode=async_logging, human_log_every=human_log_every,
+                        hand_history=hand_history, big_blind=env.big_blind)
     
     print(f"Agents: {agents[0].name} vs {agents[1].name}")
     print(f"Running for {num_hands} hands. Random Stacks: {randomize_stacks}")
     print(f"Logging to '{logger.log_dir}/'")
-    
+
+    # 性能剖析 (可选): 对env、agents、logger和encoder计时，并定期打印
+    profiler = Profiler() if profile else None
+    encode = instrument(profiler, env, agents, logger) if profiler else encode_state_to_psv
+
+    def report(hand_id):
+        if hand_id % 10 == 0:
+            print(f"  Hand #{hand_id} completed.")
+        if profiler and hand_id % profile_every == 0:
+            print(profiler.format_report())
+
     try:
-        for hand_id in range(1, num_hands + 1):
-            state = env.reset(randomize_stacks=randomize_stacks)
-            done = False
-            
-            while not done:
-                current_player_id = state['current_player']
-                legal_actions = env.get_legal_actions()
-                
-                if not legal_actions:
-                    state = env._get_state()
-                    done = state['done']
-                    continue
-
-                agent = agents[current_player_id]
-                action = agent.act(state, legal_actions)
-                state = env.step(action)
-                done = state['done']
-            
-            final_state = state
-            logger.log_human_readable(final_state, hand_id)
-            
-            results = final_state['winner_info']['results']
-            for i in range(2):
-                # We encode the final state for simplicity, though in training we'd encode pre-decision states
-                psv = encode_state_to_psv(final_state, player_perspective=i)
-                result = results[i]
-                logger.log_vectorized(psv, result)
-            
-            if hand_id % 10 == 0:
-                print(f"  Hand #{hand_id} completed.")
-    
+        play_hands(env, agents, logger, 1, num_hands, randomize_stacks, on_hand_done=report, encode=encode,
+                   result_key='ev_results' if allin_ev else 'results')
     finally:
         logger.close()
+        if profiler:
+            print(profiler.format_report())
+            profiler.dump(os.path.join(logger.log_dir, 'profile.json'))
         print(f"\nFinished run. Log files closed.")
         print(f"Human-readable log: {logger.human_log_file.name}")
-        print(f"Training data (CSV): {logger.vector_log_file.name}")
+        print(f"Training data ({data_format}): {logger.vector_log_path}")
 
 if __name__ == "__main__":
     main(num_hands=10)
\ No newline at end of file
@@ -0,0 +1,150 @@
+# utils/batch_driver.py
+
+from collections.abc import Sequence
+import numpy as np
+
+from HULHE_env.environment import ACTIONS
+from utils.encoder import encode_state_to_psv
+
+# 合法动作位掩码 -> (4,)布尔行 (列顺序同ACTIONS)
+MASK_ROWS = (np.arange(1 << len(ACTIONS))[:, None] >> np.arange(len(ACTIONS)) & 1).astype(bool)
+
+def _agent_groups(agents):
+    """
+    按对象去重的agent列表，以及每个座位所属的组下标。同一个Agent坐在两个座位上时 (自博弈) 只算一组。
+    """
+    unique, seat_group = [], []
+    for agent in agents:
+        for g, other in enumerate(unique):
+            if other is agent: break
+        else:
+            g = len(unique)
+            unique.append(agent)
+        seat_group.append(g)
+    return unique, np.array(seat_group, dtype=np.int64)
+
+class _Subset(Sequence):
+    """
+    states中按下标选出的惰性子序列 (不实际取出各个状态，act_batch不读状态时没有任何开销)。
+    """
+    __slots__ = ('_states', '_indices')
+
+    def __init__(self, states, indices):
+        self._states = states
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, i):
+        return self._states[self._indices[i]]
+
+def dispatch(agents, players, states, legal_masks):
+    """
+    一次批量决策: players[i]为第i个待决策状态的座位，按座位上的Agent分组后每组调用一次act_batch，
+    再把动作按原顺序拼回。返回(N,)的动作下标。
+    """
+    unique, seat_group = _agent_groups(agents)
+    groups = seat_group[np.asarray(players, dtype=np.int64)]
+    actions = np.empty(len(groups), dtype=np.int64)
+    for g, agent in enumerate(unique):
+        idx = np.flatnonzero(groups == g)
+        if len(idx) == 0: continue
+        actions[idx] = agent.act_batch(_Subset(states, idx), legal_masks[idx])
+    return actions
+
+class BatchDriver:
+    """
+    在多张独立的PokerEnv牌桌上并发进行牌局。每一轮 (tick) 收集所有牌桌上待决策的状态，
+    按Agent分组后各调用一次act_batch，再把动作分发回各牌桌执行，
+    从而把每次决策的固定开销 (例如一次神经网络推理) 分摊到整批牌桌上。
+    一张牌桌的牌局结束后立即开始下一局，直到开局总数达到num_hands。
+    """
+    def __init__(self, envs, agents, randomize_stacks=True):
+        self.envs = list(envs)
+        self.agents = agents
+        self.randomize_stacks = randomize_stacks
+        self.ticks = 0
+        self.decisions = 0
+
+    def run(self, num_hands, on_hand_done=None):
+        """
+        共进行num_hands局。每局结束时调用on_hand_done(table, final_state)，
+        final_state是该牌桌环境的状态视图，只在本次回调中有效 (回调返回后牌桌即开始下一局)。
+        """
+        envs, randomize_stacks = self.envs, self.randomize_stacks
+        states = {}
+        started = 0
+        for table, env in enumerate(envs[:num_hands]):
+            states[table] = env.reset(randomize_stacks=randomize_stacks)
+            started += 1
+
+        while states:
+            # 1. 收集所有牌桌的待决策状态
+            tables = list(states)
+            envs_now = [envs[t] for t in tables]
+            players = [env.current_player for env in envs_now]
+            legal_masks = MASK_ROWS[[env.get_legal_mask() for env in envs_now]]
+
+            # 2. 每组Agent一次批量决策
+            actions = dispatch(self.agents, players, [states[t] for t in tables], legal_masks)
+            self.ticks += 1
+            self.decisions += len(tables)
+
+            # 3. 分发动作，结束的牌桌开始新的一局
+            for table, env, action in zip(tables, envs_now, actions.tolist()):
+                state = env.step(ACTIONS[action])
+                if not state['done']: continue
+                if on_hand_done is not None: on_hand_done(table, state)
+                if started < num_hands:
+                    states[table] = env.reset(randomize_stacks=randomize_stacks)
+                    started += 1
+                else:
+                    del states[table]
+
+    @property
+    def decisions_per_tick(self):
+        return self.decisions / self.ticks if self.ticks else 0.0
+
+def play_hands_batched(envs, agents, logger, first_hand_id, num_hands, randomize_stacks=True, on_hand_done=None,
+                       encode=encode_state_to_psv, result_key='results'):
+    """
+    play_hands的多牌桌批量决策版本: 在envs上并发进行num_hands局并写入logger。
+    牌局按结束的先后顺序编号 (从first_hand_id开始)，每局的记录与play_hands相同。
+    """
+    next_hand_id = [first_hand_id]
+
+    def log_hand(table, final_state):
+        hand_id = next_hand_id[0]
+        next_hand_id[0] += 1
+        logger.log_human_readable(final_state, hand_id)
+        results = final_state['winner_info'][result_key]
+        for i in range(2):
+            logger.log_vectorized(encode(final_state, player_perspective=i), results[i])
+        if on_hand_done is not None: on_hand_done(hand_id)
+
+    driver = BatchDriver(envs, agents, randomize_stacks)
+    driver.run(num_hands, log_hand)
+    return driver
+
+class _TableStates(Sequence):
+    """
+    VecPokerEnv批量状态的惰性序列: 第i项为牌桌i的状态字典，只在被访问时才切片构造。
+    """
+    __slots__ = ('_state',)
+
+    def __init__(self, state):
+        self._state = state
+
+    def __len__(self):
+        return len(self._state['current_player'])
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self): raise IndexError(i)
+        return {key: value[i] for key, value in self._state.items()}
+
+def act_vec(agents, state):
+    """
+    为VecPokerEnv的所有牌桌做一次批量决策 (state为reset/step返回的批量状态)，返回可直接传给step的动作数组。
+    """
+    return dispatch(agents, state['current_player'], _TableStates(state), state['legal_mask'])
@@ -0,0 +1,188 @@
+# utils/dataset.py
+
+import os
+import json
+import numpy as np
+
+from utils.encoder import PSV_DIM, HISTORY_OFFSET, STEP_DIM, STEPS_PER_ROUND
+
+MANIFEST_NAME = 'manifest.json'
+FORMATS = ('raw', 'compact')
+
+# 紧凑编码: PSV中除历史序列的3维数值状态外全部是0/1的one-hot，
+# one-hot部分按位打包 (241维 -> 31字节)，数值部分存为float16 (60维 -> 120字节)。
+NUMERIC_DIMS = np.array([HISTORY_OFFSET + step * STEP_DIM + k
+                         for step in range(4 * STEPS_PER_ROUND) for k in range(3)])
+ONE_HOT_DIMS = np.setdiff1d(np.arange(PSV_DIM), NUMERIC_DIMS)
+
+def pack_psv(psvs):
+    """
+    将(N, 301)的PSV批量编码为 (位打包的one-hot, float16数值)。
+    """
+    psvs = np.asarray(psvs, dtype=np.float32).reshape(-1, PSV_DIM)
+    bits = np.packbits(psvs[:, ONE_HOT_DIMS] != 0, axis=1)
+    numerics = psvs[:, NUMERIC_DIMS].astype(np.float16)
+    return bits, numerics
+
+def unpack_psv(bits, numerics, out=None):
+    """
+    pack_psv的逆变换，返回(N, 301)的float32数组 (数值部分精度为float16)。
+    提供out时直接写入out (one-hot与数值两部分覆盖全部维度) 并返回out。
+    """
+    bits, numerics = np.asarray(bits), np.asarray(numerics)
+    psvs = np.zeros((len(bits), PSV_DIM), dtype=np.float32) if out is None else out
+    psvs[:, ONE_HOT_DIMS] = np.unpackbits(bits, axis=1, count=len(ONE_HOT_DIMS))
+    psvs[:, NUMERIC_DIMS] = numerics
+    return psvs
+
+def _shard_files(data_format, shard_idx, with_counts=False):
+    if data_format == 'raw':
+        names = {'psv': 'psv', 'result': 'result'}
+    else:
+        names = {'bits': 'psv_bits', 'numerics': 'psv_numerics', 'result': 'result'}
+    if with_counts: names['count'] = 'count'
+    return {key: f"{name}_{shard_idx:05d}.npy" for key, name in names.items()}
+
+class ShardWriter:
+    """
+    将(PSV, result)追加写入固定行数的.npy分片，并在close时写出manifest.json。
+    data_format='raw' 保存float32的PSV；'compact' 保存位打包one-hot + float16数值。
+    with_counts=True时每行额外带一个合并计数 (去重后的数据集，见utils/dedup.py)。
+    """
+    def __init__(self, out_dir, shard_size=16384, data_format='raw', with_counts=False):
+        if data_format not in FORMATS: raise ValueError(f"Unknown data format '{data_format}'.")
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.data_format = data_format
+        self.with_counts = with_counts
+        if not os.path.exists(self.out_dir): os.makedirs(self.out_dir)
+        self._psv_buffer = np.zeros((shard_size, PSV_DIM), dtype=np.float32)
+        self._result_buffer = np.zeros(shard_size, dtype=np.float32)
+        self._count_buffer = np.ones(shard_size, dtype=np.int64)
+        self._rows = 0
+        self.shards = []
+
+    def append(self, psv, result, count=1):
+        self._psv_buffer[self._rows] = psv
+        self._result_buffer[self._rows] = result
+        self._count_buffer[self._rows] = count
+        self._rows += 1
+        if self._rows == self.shard_size: self._flush_shard()
+
+    def append_batch(self, psvs, results, counts=None):
+        psvs, results = np.asarray(psvs), np.asarray(results)
+        if counts is None: counts = np.ones(len(psvs), dtype=np.int64)
+        start = 0
+        while start < len(psvs):
+            count = min(self.shard_size - self._rows, len(psvs) - start)
+            self._psv_buffer[self._rows:self._rows + count] = psvs[start:start + count]
+            self._result_buffer[self._rows:self._rows + count] = results[start:start + count]
+            self._count_buffer[self._rows:self._rows + count] = counts[start:start + count]
+            self._rows += count
+            start += count
+            if self._rows == self.shard_size: self._flush_shard()
+
+    def _flush_shard(self):
+        if self._rows == 0: return
+        files = _shard_files(self.data_format, len(self.shards), self.with_counts)
+        psvs = self._psv_buffer[:self._rows]
+        if self.data_format == 'raw':
+            arrays = {'psv': psvs}
+        else:
+            bits, numerics = pack_psv(psvs)
+            arrays = {'bits': bits, 'numerics': numerics}
+        arrays['result'] = self._result_buffer[:self._rows]
+        if self.with_counts: arrays['count'] = self._count_buffer[:self._rows]
+        for key, array in arrays.items():
+            np.save(os.path.join(self.out_dir, files[key]), array)
+        self.shards.append({'rows': self._rows, 'files': files})
+        self._rows = 0
+
+    def close(self, metadata=None):
+        """
+        写出最后一个分片和manifest.json；metadata中的字段会合并进manifest。
+        """
+        self._flush_shard()
+        manifest = {
+            'format': self.data_format,
+            'psv_dim': PSV_DIM,
+            'shard_size': self.shard_size,
+            'num_rows': sum(s['rows'] for s in self.shards),
+            'shards': self.shards,
+        }
+        if metadata: manifest.update(metadata)
+        with open(os.path.join(self.out_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+class ShardedArray:
+    """
+    把多个内存映射的分片拼接成一个逻辑上的数组 (不复制数据)。
+    整数下标和落在单个分片内的切片直接返回内存映射视图；跨分片的切片和下标数组会做一次gather。
+    """
+    def __init__(self, shards):
+        self.shards = shards
+        self.offsets = np.cumsum([0] + [len(s) for s in shards])
+        self.shape = (int(self.offsets[-1]),) + (shards[0].shape[1:] if shards else ())
+        self.dtype = shards[0].dtype if shards else np.float32
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _locate(self, index):
+        shard_idx = int(np.searchsorted(self.offsets, index, side='right')) - 1
+        return shard_idx, index - int(self.offsets[shard_idx])
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            if key < 0: key += len(self)
+            if not 0 <= key < len(self): raise IndexError(key)
+            shard_idx, local = self._locate(key)
+            return self.shards[shard_idx][local]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1 and start < stop:
+                shard_idx, local = self._locate(start)
+                if stop <= self.offsets[shard_idx + 1]:
+                    return self.shards[shard_idx][local:local + stop - start]
+            key = np.arange(start, stop, step)
+        indices = np.asarray(key)
+        if indices.dtype == bool: indices = np.flatnonzero(indices)
+        indices = np.where(indices < 0, indices + len(self), indices)
+        out = np.empty((len(indices),) + self.shape[1:], dtype=self.dtype)
+        shard_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        for shard_idx in np.unique(shard_ids):
+            sel = shard_ids == shard_idx
+            out[sel] = self.shards[shard_idx][indices[sel] - self.offsets[shard_idx]]
+        return out
+
+class ShardReader:
+    """
+    以内存映射方式读取ShardWriter写出的数据集。
+    raw格式下 psv 为(N, 301)的逻辑数组；compact格式下通过 bits / numerics 访问原始编码，
+    或用 get_psv 解码为float32。去重后的数据集另有 counts (每行合并的原始行数)，其余数据集为None。
+    """
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        with open(os.path.join(data_dir, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        self.data_format = self.manifest['format']
+        columns = {}
+        for shard in self.manifest['shards']:
+            for key, name in shard['files'].items():
+                columns.setdefault(key, []).append(np.load(os.path.join(data_dir, name), mmap_mode='r'))
+        self.columns = {key: ShardedArray(shards) for key, shards in columns.items()}
+        self.results = self.columns.get('result', ShardedArray([]))
+        self.psv = self.columns.get('psv')
+        self.bits = self.columns.get('bits')
+        self.numerics = self.columns.get('numerics')
+        self.counts = self.columns.get('count')
+
+    def __len__(self):
+        return self.manifest['num_rows']
+
+    def get_psv(self, key):
+        if self.data_format == 'raw': return np.asarray(self.psv[key], dtype=np.float32)
+        bits, numerics = self.bits[key], self.numerics[key]
+        if bits.ndim == 1: return unpack_psv(bits[None], numerics[None])[0]
+        return unpack_psv(bits, numerics)
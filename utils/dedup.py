@@ -0,0 +1,112 @@
+# utils/dedup.py
+
+import os
+import argparse
+import numpy as np
+
+from utils.dataset import ShardReader, ShardWriter, FORMATS, pack_psv
+from utils.encoder import canonicalize_psv
+
+SOURCE_INDEX_NAME = 'source_index.npy'
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+def _mix64(x):
+    # splitmix64的终结混合
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+def packed_keys(psvs):
+    """
+    每行PSV的去重键: 紧凑编码 (位打包one-hot + float16数值) 的字节，(N, K) uint8。
+    """
+    bits, numerics = pack_psv(psvs)
+    return np.concatenate([bits, np.ascontiguousarray(numerics).view(np.uint8)], axis=1)
+
+def hash_psvs(psvs):
+    """
+    每行PSV的64位哈希。以packed_keys为键，因此同一批牌局无论保存为raw还是compact格式都得到相同的哈希。
+    """
+    data = packed_keys(psvs)
+    pad = -data.shape[1] % 8
+    if pad: data = np.concatenate([data, np.zeros((len(data), pad), dtype=np.uint8)], axis=1)
+    words = np.ascontiguousarray(data).view(np.uint64)
+    hashes = np.zeros(len(words), dtype=np.uint64)
+    for i in range(words.shape[1]):
+        hashes = _mix64(hashes * _HASH_MULTIPLIER + words[:, i])
+    return hashes
+
+def _load_psvs(reader, key, canonical):
+    psvs = reader.get_psv(key)
+    return canonicalize_psv(psvs) if canonical else psvs
+
+def build_dedup_index(data_dir, out_dir, canonical=True, data_format=None, chunk_rows=65536, shard_size=16384):
+    """
+    对data_dir中的数据集去重: 以(规范化后的)信息集哈希为键，把重复的行合并为一条记录，
+    记录的count为合并的原始行数，result为这些行的平均结果。输出仍是ShardWriter格式的数据集
+    (多一个count列)，记录按首次出现的顺序排列；source_index.npy给出每个原始行对应的记录下标。
+    哈希只用于初步分组: 每行都与所在组的代表行逐字节比较，哈希碰撞的行按完整的键另行分组，不会被错误合并。
+    输入本身是去重数据集时按其count加权，因此可以反复合并。返回输出的manifest。
+    """
+    reader = ShardReader(data_dir)
+    num_rows = len(reader)
+
+    # 1. 逐块计算哈希
+    hashes = np.empty(num_rows, dtype=np.uint64)
+    for start in range(0, num_rows, chunk_rows):
+        hashes[start:start + chunk_rows] = hash_psvs(_load_psvs(reader, slice(start, start + chunk_rows), canonical))
+
+    # 2. 按哈希分组
+    _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    # 3. 碰撞检查: 与组代表行的键不一致的行按完整的键重新分组
+    collided = []
+    for start in range(0, num_rows, chunk_rows):
+        stop = min(start + chunk_rows, num_rows)
+        keys = packed_keys(_load_psvs(reader, slice(start, stop), canonical))
+        representatives = packed_keys(_load_psvs(reader, first[inverse[start:stop]], canonical))
+        collided.append(start + np.flatnonzero((keys != representatives).any(axis=1)))
+    collided = np.concatenate(collided)
+    if len(collided):
+        _, sub_first, sub_inverse = np.unique(packed_keys(_load_psvs(reader, collided, canonical)), axis=0,
+                                              return_index=True, return_inverse=True)
+        inverse[collided] = len(first) + sub_inverse.reshape(-1)
+        first = np.concatenate([first, collided[sub_first]])
+
+    # 4. 聚合计数与结果
+    weights = np.asarray(reader.counts[:], dtype=np.float64) if reader.counts is not None else np.ones(num_rows)
+    results = np.asarray(reader.results[:], dtype=np.float64)
+    counts = np.bincount(inverse, weights=weights, minlength=len(first))
+    means = np.bincount(inverse, weights=weights * results, minlength=len(first)) / counts
+
+    order = np.argsort(first, kind='stable')
+    record_of_group = np.empty_like(order)
+    record_of_group[order] = np.arange(len(order))
+
+    # 5. 按首次出现的顺序写出每组的代表行
+    writer = ShardWriter(out_dir, shard_size=shard_size, data_format=data_format or reader.data_format, with_counts=True)
+    for start in range(0, len(order), chunk_rows):
+        groups = order[start:start + chunk_rows]
+        writer.append_batch(_load_psvs(reader, first[groups], canonical), means[groups], counts[groups].astype(np.int64))
+    np.save(os.path.join(out_dir, SOURCE_INDEX_NAME), record_of_group[inverse])
+    return writer.close(metadata={
+        'deduplicated': True,
+        'canonical': canonical,
+        'source_dir': os.path.abspath(data_dir),
+        'source_rows': num_rows,
+        'source_index': SOURCE_INDEX_NAME,
+    })
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deduplicate a sharded PSV dataset by (canonical) information set.")
+    parser.add_argument('data_dir')
+    parser.add_argument('out_dir')
+    parser.add_argument('--no-canonical', action='store_true', help="hash the PSVs as stored, without suit canonicalization")
+    parser.add_argument('--format', choices=FORMATS, default=None, help="output format (default: same as input)")
+    args = parser.parse_args(argv)
+    manifest = build_dedup_index(args.data_dir, args.out_dir, canonical=not args.no_canonical, data_format=args.format)
+    print(f"{manifest['source_rows']} rows -> {manifest['num_rows']} records in '{args.out_dir}/'")
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,10 @@
 
 import numpy as np
 
+from HULHE_env.history import HISTORY_ACTIONS
+from HULHE_env.cards import STR_TO_INDEX, INDEX_TO_STR
+from HULHE_env.canonical import canonicalize, canonicalize_batch
+
 CARD_RANK = '23456789TJQKA'
 CARD_SUIT = 'shdc'
 
@@ -13,37 +17,21 @@ def _encode_card(card_str):
     suit_vec[CARD_SUIT.find(suit)] = 1
     return np.concatenate([rank_vec, suit_vec])
 
-def encode_state_to_psv(state, player_perspective):
-    """
-    将环境状态编码为301维的“富历史”PSV (v3.1)。
-    """
-    # --- 1. 静态信息 (121 dims) ---
-    my_hand_str = state['full_info']['hands'][player_perspective]
-    private_hand_vec = np.concatenate([_encode_card(c) for c in my_hand_str])
-    
-    community_cards_str = state['community_cards']
-    community_cards_padded = (community_cards_str + [None] * 5)[:5]
-    community_cards_vec = np.concatenate([_encode_card(c) for c in community_cards_padded])
-    
-    position_vec = np.array([1, 0] if state['button_player'] == player_perspective else [0, 1], dtype=np.float32)
-
-    static_info_vec = np.concatenate([private_hand_vec, community_cards_vec, position_vec])
-
-    # --- 2. 动态信息: 富历史序列 (180 dims) ---
+def _encode_history_dicts(action_history, player_perspective):
     action_history_vec = np.zeros((4, 5, 9), dtype=np.float32)
     round_map = {'preflop': 0, 'flop': 1, 'turn': 2, 'river': 3}
     action_map = {'fold': 0, 'check': 1, 'call': 2, 'raise': 3}
     step_counters = [0, 0, 0, 0]
     
     total_initial_stack = 400 # Hardcoded as per README
-
-    for action_item in state['action_history']:
+    
+    for action_item in action_history:
         round_idx = round_map.get(action_item['round'])
         if round_idx is None: continue
         
         step_idx = step_counters[round_idx]
         if step_idx >= 5: continue
-
+    
         # a. Numeric State (3 dims)
         snapshot = action_item['state_after_action']['numeric_state']
         my_stack = snapshot['stacks'][player_perspective]
@@ -54,10 +42,10 @@ def encode_state_to_psv(state, player_perspective):
             opp_stack / total_initial_stack,
             pot_size / total_initial_stack
         ], dtype=np.float32)
-
+    
         # b. Player Position (2 dims)
         player_pos_vec = np.array([1, 0] if action_item['player'] == 0 else [0, 1], dtype=np.float32)
-
+    
         # c. Action (4 dims)
         action_vec = np.zeros(4, dtype=np.float32)
         action_name = action_item['action']
@@ -68,7 +56,177 @@ def encode_state_to_psv(state, player_perspective):
         
         action_history_vec[round_idx, step_idx] = np.concatenate([numeric_state_vec, player_pos_vec, action_vec])
         step_counters[round_idx] += 1
-        
+    return action_history_vec
+
+def _encode_history_records(history, player_perspective):
+    """
+    直接从ActionHistory的记录数组向量化地编码历史序列，结果与_encode_history_dicts一致。
+    """
+    action_history_vec = np.zeros((4, 5, 9), dtype=np.float32)
+    if len(history) == 0: return action_history_vec
+    streets = history.streets.astype(np.int64)
+    steps = np.arange(len(streets)) - np.searchsorted(streets, streets)
+    keep = steps < 5
+    streets, steps = streets[keep], steps[keep]
+    stacks = history.stacks[keep]
+
+    action_history_vec[streets, steps, 0] = stacks[:, player_perspective] / TOTAL_INITIAL_STACK
+    action_history_vec[streets, steps, 1] = stacks[:, 1 - player_perspective] / TOTAL_INITIAL_STACK
+    action_history_vec[streets, steps, 2] = history.pots[keep] / TOTAL_INITIAL_STACK
+    action_history_vec[streets, steps, 3 + history.players[keep].astype(np.int64)] = 1
+    action_history_vec[streets, steps, 5 + HISTORY_CODE_TO_PSV_ACTION[history.actions[keep]]] = 1
+    return action_history_vec
+
+def _canonical_card_strs(hand_str, community_cards_str):
+    hand, board, _ = canonicalize([STR_TO_INDEX[c] for c in hand_str], [STR_TO_INDEX[c] for c in community_cards_str])
+    return [INDEX_TO_STR[c] for c in hand], [INDEX_TO_STR[c] for c in board]
+
+def encode_state_to_psv(state, player_perspective, canonical=False):
+    """
+    将环境状态编码为301维的“富历史”PSV (v3.1)。
+    canonical=True时输出花色同构的规范形式 (见HULHE_env/canonical.py)，只相差花色重命名的信息集得到相同的PSV。
+    """
+    # --- 1. 静态信息 (121 dims) ---
+    my_hand_str = state['full_info']['hands'][player_perspective]
+    community_cards_str = state['community_cards']
+    if canonical: my_hand_str, community_cards_str = _canonical_card_strs(my_hand_str, community_cards_str)
+    private_hand_vec = np.concatenate([_encode_card(c) for c in my_hand_str])
+    
+    community_cards_padded = (community_cards_str + [None] * 5)[:5]
+    community_cards_vec = np.concatenate([_encode_card(c) for c in community_cards_padded])
+    
+    position_vec = np.array([1, 0] if state['button_player'] == player_perspective else [0, 1], dtype=np.float32)
+
+    static_info_vec = np.concatenate([private_hand_vec, community_cards_vec, position_vec])
+
+    # --- 2. 动态信息: 富历史序列 (180 dims) ---
+    action_history = state['action_history']
+    if hasattr(action_history, 'records'):
+        action_history_vec = _encode_history_records(action_history, player_perspective)
+    else:
+        action_history_vec = _encode_history_dicts(action_history, player_perspective)
     dynamic_info_vec = action_history_vec.flatten()
 
-    return np.concatenate([static_info_vec, dynamic_info_vec])
\ No newline at end of file
+    return np.concatenate([static_info_vec, dynamic_info_vec])
+
+# --- 增量编码 ---
+# PSV各组成部分在301维向量中的起始下标
+PSV_DIM = 301
+CARD_DIM = 17
+HAND_OFFSET = 0
+COMMUNITY_OFFSET = 2 * CARD_DIM
+POSITION_OFFSET = COMMUNITY_OFFSET + 5 * CARD_DIM
+HISTORY_OFFSET = POSITION_OFFSET + 2
+STEP_DIM = 9
+STEPS_PER_ROUND = 5
+
+ROUND_INDEX = {'preflop': 0, 'flop': 1, 'turn': 2, 'river': 3}
+# 与encode_state_to_psv中的映射保持一致: check与盲注记为call，bet记为raise
+ACTION_INDEX = {'fold': 0, 'check': 2, 'call': 2, 'small_blind': 2, 'big_blind': 2, 'raise': 3, 'bet': 3}
+HISTORY_CODE_TO_PSV_ACTION = np.array([ACTION_INDEX[a] for a in HISTORY_ACTIONS])
+TOTAL_INITIAL_STACK = 400
+# 牌面字符串 -> (rank下标, suit下标 + 13)，避免逐次解析字符串
+_CARD_ONE_HOT = {r + s: (ri, 13 + si) for ri, r in enumerate(CARD_RANK) for si, s in enumerate(CARD_SUIT)}
+
+class IncrementalPSVEncoder:
+    """
+    挂载在一局牌上的增量PSV编码器。
+    为两个视角各维护一个预分配的301维缓冲区，每次update只写入新发出的公共牌和新增的历史步，
+    使得整局编码的总开销与动作数成线性关系。输出与encode_state_to_psv逐位一致。
+    用法: 每局开始时reset(state)，之后每次env.step后update(state)，需要PSV时调用encode。
+    """
+    def __init__(self):
+        self.buffers = np.zeros((2, PSV_DIM), dtype=np.float32)
+        self._num_community = 0
+        self._history_cursor = 0
+        self._step_counters = [0, 0, 0, 0]
+
+    def reset(self, state):
+        self.buffers.fill(0)
+        hands = state['full_info']['hands']
+        for p in range(2):
+            for i, card in enumerate(hands[p]):
+                self._write_card(self.buffers[p], HAND_OFFSET + i * CARD_DIM, card)
+            self.buffers[p, POSITION_OFFSET + (0 if state['button_player'] == p else 1)] = 1
+        self._num_community = 0
+        self._history_cursor = 0
+        self._step_counters = [0, 0, 0, 0]
+        self.update(state)
+
+    def update(self, state):
+        community_cards = state['community_cards']
+        for i in range(self._num_community, min(len(community_cards), 5)):
+            for p in range(2):
+                self._write_card(self.buffers[p], COMMUNITY_OFFSET + i * CARD_DIM, community_cards[i])
+        self._num_community = len(community_cards)
+
+        action_history = state['action_history']
+        if hasattr(action_history, 'records'):
+            for i in range(self._history_cursor, len(action_history)):
+                street, player, action, _, stack0, stack1, pot_size = action_history.raw_row(i)[:7]
+                self._write_step(street, player, int(HISTORY_CODE_TO_PSV_ACTION[action]), (stack0, stack1), pot_size)
+        else:
+            for action_item in action_history[self._history_cursor:]:
+                snapshot = action_item['state_after_action']['numeric_state']
+                self._write_step(ROUND_INDEX.get(action_item['round']), action_item['player'],
+                                 ACTION_INDEX.get(action_item['action']), snapshot['stacks'], snapshot['pot'])
+        self._history_cursor = len(action_history)
+
+    def encode(self, player_perspective, out=None):
+        """
+        返回指定视角的PSV副本；若提供out，则直接写入out并返回out。
+        """
+        if out is None: return self.buffers[player_perspective].copy()
+        out[:] = self.buffers[player_perspective]
+        return out
+
+    @staticmethod
+    def _write_card(buffer, offset, card_str):
+        rank_idx, suit_idx = _CARD_ONE_HOT[card_str]
+        buffer[offset + rank_idx] = 1
+        buffer[offset + suit_idx] = 1
+
+    def _write_step(self, round_idx, player, action_idx, stacks, pot_size):
+        if round_idx is None: return
+        step_idx = self._step_counters[round_idx]
+        if step_idx >= STEPS_PER_ROUND: return
+        self._step_counters[round_idx] += 1
+
+        offset = HISTORY_OFFSET + (round_idx * STEPS_PER_ROUND + step_idx) * STEP_DIM
+        for p in range(2):
+            step = self.buffers[p, offset:offset + STEP_DIM]
+            step[0] = stacks[p] / TOTAL_INITIAL_STACK
+            step[1] = stacks[1 - p] / TOTAL_INITIAL_STACK
+            step[2] = pot_size / TOTAL_INITIAL_STACK
+            step[3 + player] = 1
+            if action_idx is not None: step[5 + action_idx] = 1
+
+def encode_batch(encoders, player_perspectives, out):
+    """
+    批量模式: 将每个编码器在对应视角下的PSV写入调用方提供的(N, 301)数组。
+    """
+    for i, (encoder, perspective) in enumerate(zip(encoders, player_perspectives)):
+        out[i] = encoder.buffers[perspective]
+    return out
+
+def decode_psv_cards(psvs):
+    """
+    从(N, 301)的PSV中还原 [手牌x2, 公共牌x5] 的紧凑牌面下标，空位为-1。
+    """
+    slots = np.asarray(psvs)[:, HAND_OFFSET:POSITION_OFFSET].reshape(-1, 7, CARD_DIM)
+    cards = slots[:, :, :13].argmax(axis=2) * 4 + slots[:, :, 13:].argmax(axis=2)
+    return np.where(slots.any(axis=2), cards, -1)
+
+def canonicalize_psv(psvs):
+    """
+    批量把已有的PSV (例如旧数据集) 改写为花色同构的规范形式，只有牌面部分会改变。
+    结果与encode_state_to_psv(..., canonical=True) 逐位一致。
+    """
+    psvs = np.array(psvs, dtype=np.float32).reshape(-1, PSV_DIM)
+    cards = canonicalize_batch(decode_psv_cards(psvs))
+    slots = psvs[:, HAND_OFFSET:POSITION_OFFSET].reshape(-1, 7, CARD_DIM)
+    slots.fill(0)
+    rows, cols = np.nonzero(cards >= 0)
+    slots[rows, cols, cards[rows, cols] // 4] = 1
+    slots[rows, cols, 13 + cards[rows, cols] % 4] = 1
+    return psvs
@@ -0,0 +1,396 @@
+# utils/env_server.py
+
+import signal
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from collections import namedtuple
+import numpy as np
+
+from HULHE_env.environment import PokerEnv, ACTIONS
+from HULHE_env.dealer import fresh_seed
+from utils.batch_driver import MASK_ROWS
+from utils.encoder import IncrementalPSVEncoder, PSV_DIM
+
+# 一个槽位 (slot) 的数据，均为共享内存上的零拷贝视图，每行对应槽位中的一张牌桌:
+#   psv        当前行动者视角的PSV (T, 301) float32
+#   legal_mask 合法动作掩码 (T, 4) bool，列顺序同ACTIONS
+#   player     当前行动者座位 (T,) int8
+#   reward     上一步结束的那一局双方的净输赢 (T, 2) float32，未结束为0
+#   done       上一步是否结束了一局 (结束的牌桌已自动开始下一局，psv等为新一局的观测) (T,) bool
+#   truncated  该牌桌的牌局因worker重启被放弃 (该局的轨迹应丢弃) (T,) bool
+#   action     学习方写入的动作下标 (T,) int8
+# slot为槽位编号；ticket用于识别worker重启后失效的旧批次。
+SlotBatch = namedtuple('SlotBatch', ['slot', 'ticket', 'psv', 'legal_mask', 'player', 'reward', 'done', 'truncated', 'action'])
+
+_FIELDS = (
+    ('psv', np.float32, (PSV_DIM,)),
+    ('legal_mask', np.bool_, (len(ACTIONS),)),
+    ('player', np.int8, ()),
+    ('reward', np.float32, (2,)),
+    ('done', np.bool_, ()),
+    ('truncated', np.bool_, ()),
+    ('action', np.int8, ()),
+)
+_ALIGN = 64
+
+# worker命令 / 回复
+_RESET, _STEP = 0, 1
+_READY, _ERROR = 0, 1
+
+def _layout(num_slots, tables_per_slot):
+    """
+    共享内存中各字段的 (偏移, dtype, 形状)，每个字段按缓存行对齐。返回 (布局, 总字节数)。
+    """
+    layout, offset = {}, 0
+    for name, dtype, row_shape in _FIELDS:
+        shape = (num_slots, tables_per_slot) + row_shape
+        layout[name] = (offset, dtype, shape)
+        offset += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // _ALIGN) * _ALIGN
+    return layout, offset
+
+def _views(shm, layout):
+    return {name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for name, (offset, dtype, shape) in layout.items()}
+
+def worker_seeds(seed, worker, generation, num_tables):
+    """
+    第generation次启动的worker的各牌桌种子。由主种子、worker编号和启动次数确定，
+    因此不发生重启时整个服务器的牌局序列只取决于seed。
+    """
+    children = np.random.SeedSequence(seed, spawn_key=(worker, generation)).spawn(num_tables)
+    return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in children]
+
+# --- worker进程 ---
+class _SlotTables:
+    """
+    worker中一个槽位的牌桌: 每张牌桌一个PokerEnv和一个IncrementalPSVEncoder，观测直接写入共享内存。
+    """
+    def __init__(self, seeds, views, slot, env_kwargs, randomize_stacks, result_key):
+        self.envs = [PokerEnv(seed=seed, **env_kwargs) for seed in seeds]
+        self.encoders = [IncrementalPSVEncoder() for _ in seeds]
+        self.randomize_stacks = randomize_stacks
+        self.result_key = result_key
+        self.psv, self.legal_mask, self.player = views['psv'][slot], views['legal_mask'][slot], views['player'][slot]
+        self.reward, self.done, self.truncated = views['reward'][slot], views['done'][slot], views['truncated'][slot]
+        self.action = views['action'][slot]
+        self._masks = [0] * len(seeds)
+
+    def _observe(self, t, env):
+        player = env.current_player
+        self.encoders[t].encode(player, out=self.psv[t])
+        self.player[t] = player
+        self._masks[t] = env.get_legal_mask()
+
+    def _new_hand(self, t, env):
+        state = env.reset(randomize_stacks=self.randomize_stacks)
+        self.encoders[t].reset(state)
+        return state
+
+    def reset(self, truncated=False):
+        self.reward.fill(0)
+        self.done.fill(False)
+        self.truncated.fill(truncated)
+        for t, env in enumerate(self.envs):
+            self._new_hand(t, env)
+            self._observe(t, env)
+        self.legal_mask[:] = MASK_ROWS[self._masks]
+
+    def step(self):
+        self.reward.fill(0)
+        self.done.fill(False)
+        self.truncated.fill(False)
+        result_key = self.result_key
+        for t, (env, action) in enumerate(zip(self.envs, self.action.tolist())):
+            state = env.step(ACTIONS[action])
+            if state['done']:
+                self.reward[t] = state['winner_info'][result_key]
+                self.done[t] = True
+                self._new_hand(t, env)
+            else:
+                self.encoders[t].update(state)
+            self._observe(t, env)
+        self.legal_mask[:] = MASK_ROWS[self._masks]
+
+def _worker_main(conn, shm_name, layout, slots, seeds, env_kwargs, randomize_stacks, result_key, restarted):
+    # Ctrl+C只由学习方处理，worker等待close()的停止命令，避免在写共享内存的中途退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = tables = None
+    try:
+        views = _views(shm, layout)
+        tables = {slot: _SlotTables(slot_seeds, views, slot, env_kwargs, randomize_stacks, result_key)
+                  for slot, slot_seeds in zip(slots, seeds)}
+        # 重启后立即为所有槽位开始新的牌局
+        if restarted:
+            for slot in slots:
+                tables[slot].reset(truncated=True)
+                conn.send((_READY, slot))
+        while True:
+            command = conn.recv()
+            if command is None: break
+            kind, slot = command
+            if kind == _STEP: tables[slot].step()
+            else: tables[slot].reset()
+            conn.send((_READY, slot))
+    except (EOFError, BrokenPipeError):
+        # 学习方已退出
+        pass
+    except BaseException:
+        try:
+            conn.send((_ERROR, traceback.format_exc()))
+        except (OSError, EOFError):
+            pass
+    finally:
+        # 共享内存上的视图必须先释放
+        views = tables = None
+        shm.close()
+        conn.close()
+
+class EnvServer:
+    """
+    本地的多进程环境服务器 (actor/learner)。num_workers个worker进程各自推进若干槽位的PokerEnv牌桌，
+    每个槽位tables_per_slot张牌桌；观测、合法掩码、奖励和动作都放在一块multiprocessing.shared_memory中，
+    进程间只通过管道传递 (命令, 槽位号) 这样的小消息。
+
+    两种用法:
+      - 同步: reset() / step(actions) 一次推进全部牌桌，返回 (num_slots * tables_per_slot) 行的视图。
+      - 异步 (流水线): recv() 取回任一已就绪槽位的SlotBatch，写入动作后 send(batch)；
+        slots_per_worker >= 2 时，学习方为一个槽位推理的同时worker在推进同一进程的另一个槽位。
+    返回的数组都是共享内存上的视图，在把该槽位send回去 (或下一次step) 之前有效，需要保留时自行复制。
+
+    自博弈: 学习方为两个座位行动，player给出每张牌桌的当前行动者。一局结束时done为True，
+    reward为双方的净输赢，牌桌自动开始下一局。
+    worker进程意外退出时 (auto_restart=True) 自动以新的种子重启，它的所有槽位重新开局并标记truncated；
+    worker中抛出的异常会在学习方以RuntimeError抛出。close() (或with语句结束) 通知worker退出并释放共享内存。
+    """
+    def __init__(self, num_workers=2, slots_per_worker=2, tables_per_slot=64, seed=None, randomize_stacks=True,
+                 allin_ev=False, initial_total_stack=400, big_blind=2, auto_restart=True, max_restarts=10,
+                 start_method=None):
+        self.num_workers = num_workers
+        self.slots_per_worker = slots_per_worker
+        self.tables_per_slot = tables_per_slot
+        self.num_slots = num_workers * slots_per_worker
+        self.num_tables = self.num_slots * tables_per_slot
+        self.seed = fresh_seed() if seed is None else seed
+        self.randomize_stacks = randomize_stacks
+        self.result_key = 'ev_results' if allin_ev else 'results'
+        self.env_kwargs = {'initial_total_stack': initial_total_stack, 'big_blind': big_blind, 'allin_ev': allin_ev}
+        self.auto_restart = auto_restart
+        self.max_restarts = max_restarts
+        self.ctx = mp.get_context(start_method)
+
+        self.layout, size = _layout(self.num_slots, tables_per_slot)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.arrays = _views(self.shm, self.layout)
+        # 同步接口使用的 (num_tables, ...) 视图
+        self._flat = {name: array.reshape((self.num_tables,) + array.shape[2:]) for name, array in self.arrays.items()}
+
+        self.processes = [None] * num_workers
+        self.conns = [None] * num_workers
+        self.generations = [0] * num_workers
+        self.restarts = 0
+        self.steps = 0
+        # 槽位状态: 已交给学习方 (held) / 正在worker中推进 (pending) / 已就绪未取走 (ready)
+        self._tickets = [0] * self.num_slots
+        self._held = set()
+        self._pending = set()
+        self._ready = []
+        self._closed = False
+        try:
+            for worker in range(num_workers): self._start_worker(worker)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def worker_slots(self, worker):
+        return list(range(worker * self.slots_per_worker, (worker + 1) * self.slots_per_worker))
+
+    def _start_worker(self, worker):
+        slots = self.worker_slots(worker)
+        generation = self.generations[worker]
+        seeds = worker_seeds(self.seed, worker, generation, len(slots) * self.tables_per_slot)
+        seeds = [seeds[i * self.tables_per_slot:(i + 1) * self.tables_per_slot] for i in range(len(slots))]
+        parent_conn, child_conn = self.ctx.Pipe()
+        process = self.ctx.Process(target=_worker_main, name=f'EnvWorker-{worker}', daemon=True,
+                                   args=(child_conn, self.shm.name, self.layout, slots, seeds, self.env_kwargs,
+                                         self.randomize_stacks, self.result_key, generation > 0))
+        process.start()
+        child_conn.close()
+        self.processes[worker] = process
+        self.conns[worker] = parent_conn
+        if generation > 0:
+            # 重启的worker会主动为所有槽位重新开局
+            self._pending.update(slots)
+
+    def restart_worker(self, worker):
+        """
+        终止并重启一个worker (例如它停止响应)。它的所有槽位以新的种子重新开局，之后照常由recv/step取回；
+        学习方手中这些槽位的旧批次随之失效，send旧批次会被忽略。
+        """
+        process, conn = self.processes[worker], self.conns[worker]
+        if process.is_alive(): process.terminate()
+        process.join()
+        conn.close()
+        slots = set(self.worker_slots(worker))
+        for slot in slots: self._tickets[slot] += 1
+        self._held -= slots
+        self._pending -= slots
+        self._ready = [slot for slot in self._ready if slot not in slots]
+        self.generations[worker] += 1
+        self.restarts += 1
+        self._start_worker(worker)
+
+    def _on_worker_exit(self, worker):
+        self.processes[worker].join()
+        exitcode = self.processes[worker].exitcode
+        if not self.auto_restart or self.restarts >= self.max_restarts:
+            raise RuntimeError(f"Env worker {worker} exited with code {exitcode}.")
+        self.restart_worker(worker)
+
+    def _poll(self, timeout=None):
+        """
+        等待至少一个worker的消息或退出，把就绪的槽位放入self._ready。超时返回False。
+        """
+        waitables = {}
+        for worker, (process, conn) in enumerate(zip(self.processes, self.conns)):
+            waitables[conn] = worker
+            waitables[process.sentinel] = worker
+        ready = wait(list(waitables), timeout)
+        if not ready: return False
+        exited = set()
+        for obj in ready:
+            worker = waitables[obj]
+            conn = self.conns[worker]
+            if obj is not conn:
+                exited.add(worker)
+                continue
+            try:
+                # 读出管道中所有已到达的消息
+                while conn.poll():
+                    kind, payload = conn.recv()
+                    if kind == _ERROR: raise RuntimeError(f"Env worker {worker} failed:\n{payload}")
+                    self._pending.discard(payload)
+                    self._ready.append(payload)
+            except (EOFError, OSError):
+                exited.add(worker)
+        # worker只在close()时正常退出，其余情况都是意外退出
+        for worker in exited: self._on_worker_exit(worker)
+        return True
+
+    def _send(self, kind, slot):
+        worker = slot // self.slots_per_worker
+        try:
+            self.conns[worker].send((kind, slot))
+        except (BrokenPipeError, OSError):
+            # worker已退出: 由_poll检测并重启
+            pass
+        self._pending.add(slot)
+
+    def _batch(self, slot):
+        arrays = self.arrays
+        return SlotBatch(slot, self._tickets[slot], arrays['psv'][slot], arrays['legal_mask'][slot], arrays['player'][slot],
+                         arrays['reward'][slot], arrays['done'][slot], arrays['truncated'][slot], arrays['action'][slot])
+
+    @staticmethod
+    def _check_actions(legal_mask, action):
+        legal = legal_mask[np.arange(len(action)), action.astype(np.int64)]
+        if not legal.all():
+            bad = int(np.flatnonzero(~legal)[0])
+            raise ValueError(f"Illegal action '{ACTIONS[action[bad]]}' at table {bad}.")
+
+    # --- 异步接口 ---
+    def start(self):
+        """
+        异步用法的开始: 让所有槽位开局。之后用recv取回就绪的槽位。
+        """
+        if self._held or self._pending or self._ready: raise RuntimeError("Env server is already running.")
+        for slot in range(self.num_slots): self._send(_RESET, slot)
+
+    def recv(self, timeout=None):
+        """
+        取回一个已就绪的槽位 (SlotBatch)，timeout秒内没有就绪的槽位时返回None。
+        """
+        while not self._ready:
+            if not self._pending: raise RuntimeError("No slots in flight; call start() or send() first.")
+            if not self._poll(timeout) and timeout is not None: return None
+        slot = self._ready.pop(0)
+        self._held.add(slot)
+        return self._batch(slot)
+
+    def send(self, batch, actions=None):
+        """
+        把槽位交还worker执行动作。actions为None时使用已写入batch.action的动作 (零拷贝)。
+        worker重启后失效的旧批次被忽略 (返回False)。
+        """
+        slot = batch.slot
+        if batch.ticket != self._tickets[slot]: return False
+        if slot not in self._held: raise ValueError(f"Slot {slot} is not awaiting actions.")
+        if actions is not None: batch.action[:] = actions
+        self._check_actions(batch.legal_mask, batch.action)
+        self._held.discard(slot)
+        self.steps += self.tables_per_slot
+        self._send(_STEP, slot)
+        return True
+
+    # --- 同步接口 ---
+    def _wait_all(self):
+        while self._pending:
+            self._poll()
+        self._ready.clear()
+        return SlotBatch(None, None, *(self._flat[name] for name in SlotBatch._fields[2:]))
+
+    def reset(self):
+        """
+        所有牌桌开始新的一局，返回 (num_tables, ...) 视图组成的SlotBatch (slot/ticket为None)。
+        """
+        if self._pending: self._wait_all()
+        self._held.clear()
+        for slot in range(self.num_slots): self._send(_RESET, slot)
+        return self._wait_all()
+
+    def step(self, actions=None):
+        """
+        所有牌桌各执行一个动作 (num_tables,)；actions为None时使用已写入的action视图。
+        """
+        if self._pending: raise RuntimeError("step() cannot be mixed with in-flight async slots.")
+        if actions is not None: self._flat['action'][:] = actions
+        self._check_actions(self._flat['legal_mask'], self._flat['action'])
+        self._held.clear()
+        self.steps += self.num_tables
+        for slot in range(self.num_slots): self._send(_STEP, slot)
+        return self._wait_all()
+
+    def close(self, timeout=5.0):
+        """
+        通知所有worker退出并等待 (超时则强制终止)，然后释放共享内存。可重复调用。
+        """
+        if self._closed: return
+        self._closed = True
+        for conn in self.conns:
+            if conn is None: continue
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            if process is None: continue
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for conn in self.conns:
+            if conn is not None: conn.close()
+        self.arrays = self._flat = None
+        self.shm.unlink()
+        try:
+            self.shm.close()
+        except BufferError:
+            # 调用方仍持有视图: 映射在这些视图释放后随之回收
+            pass
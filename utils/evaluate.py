@@ -0,0 +1,173 @@
+# utils/evaluate.py
+
+import math
+import argparse
+
+from HULHE_env.environment import PokerEnv
+from HULHE_env.dealer import fresh_seed
+from agents.registry import AGENTS
+
+# 95%置信区间的正态分位数
+Z_95 = 1.959963984540054
+
+def play_hand(env, agents, randomize_stacks=False, result_key='results'):
+    """
+    在env上完整进行一局，agents[i]坐在座位i。返回该局双方的净输赢。
+    """
+    state = env.reset(randomize_stacks=randomize_stacks)
+    while not state['done']:
+        state = env.step(agents[state['current_player']].act(state, env.get_legal_actions()))
+    return state['winner_info'][result_key]
+
+class RunningStats:
+    """
+    Welford在线均值/方差。
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+class DuplicateMatch:
+    """
+    A对B的复式比赛: 每副牌发两次、交换座位各打一局，两局A的平均输赢为一个样本。
+    两个PokerEnv使用同一个seed，因此Dealer发出完全相同的牌序列、庄家也同步轮换；
+    env0中A坐0号位，env1中A坐1号位，同一副牌的运气在配对中大部分相互抵消。
+    seed为None时抽取一个具体的种子 (记录在self.seed中)，两个环境必须共享同一个种子才能构成复式。
+    allin_ev=True时以All-in的期望输赢计分，进一步去掉All-in后发牌的方差。
+    """
+    def __init__(self, agent_a, agent_b, seed=None, randomize_stacks=False, allin_ev=False,
+                 initial_total_stack=400, big_blind=2):
+        if seed is None: seed = fresh_seed()
+        self.seed = seed
+        self.envs = [PokerEnv(initial_total_stack, big_blind, seed=seed, allin_ev=allin_ev) for _ in range(2)]
+        self.seatings = ([agent_a, agent_b], [agent_b, agent_a])
+        self.randomize_stacks = randomize_stacks
+        self.result_key = 'ev_results' if allin_ev else 'results'
+        # pairs: 每副牌的复式样本；hands: 单局样本 (用于估计复式相对普通对战的方差缩减)
+        self.pairs = RunningStats()
+        self.hands = RunningStats()
+
+    def play_pair(self):
+        """
+        打一副牌的两局，返回A在这两局的平均输赢 (筹码/局)。
+        """
+        a_results = []
+        for a_seat, (env, agents) in enumerate(zip(self.envs, self.seatings)):
+            result = play_hand(env, agents, self.randomize_stacks, self.result_key)[a_seat]
+            self.hands.add(result)
+            a_results.append(result)
+        value = (a_results[0] + a_results[1]) / 2
+        self.pairs.add(value)
+        return value
+
+    def confidence_interval(self, z=Z_95):
+        half_width = z * math.sqrt(self.pairs.variance / self.pairs.count) if self.pairs.count else math.inf
+        return self.pairs.mean - half_width, self.pairs.mean + half_width
+
+    def sprt_llrs(self, delta):
+        """
+        两个单侧SPRT的对数似然比 (正态近似，方差用样本方差估计):
+        (A每局多赢delta vs 持平, B每局多赢delta vs 持平)。
+        """
+        n, mean, variance = self.pairs.count, self.pairs.mean, self.pairs.variance
+        if variance == 0:
+            # 所有样本相同 (例如两个确定性的相同策略): 结论是确定的
+            return math.copysign(math.inf, mean - delta / 2), math.copysign(math.inf, -mean - delta / 2)
+        return n * delta * (mean - delta / 2) / variance, n * delta * (-mean - delta / 2) / variance
+
+    def variance_reduction(self):
+        """
+        相同局数下普通对战与复式估计量的方差之比，即复式赛节省的局数倍数。
+        """
+        pair_variance = self.pairs.variance
+        return self.hands.variance / (2 * pair_variance) if pair_variance > 0 else math.inf
+
+def evaluate(agent_a, agent_b, max_hands=200000, min_hands=400, delta=0.1, alpha=0.05, beta=0.05, seed=None,
+             randomize_stacks=False, allin_ev=False, check_every=1, on_progress=None):
+    """
+    用复式比赛比较A与B，直到序贯概率比检验 (SPRT) 得出结论或达到max_hands。
+    同时进行两个单侧SPRT (A强delta vs 持平、B强delta vs 持平，即Sobel-Wald三决策检验):
+    任一侧接受“更强”即停止；两侧都接受“持平”时判定双方差距小于delta。
+    delta为筹码/局；alpha、beta为两类错误率。返回结果字典:
+    hands / mean (A的筹码/局) / ci (95%) / llr / decision ('A' / 'B' / 'equal' / 'undecided') / variance_reduction。
+    """
+    match = DuplicateMatch(agent_a, agent_b, seed=seed, randomize_stacks=randomize_stacks, allin_ev=allin_ev)
+    upper = math.log((1 - beta) / alpha)
+    lower = math.log(beta / (1 - alpha))
+    decision, llr = 'undecided', (0.0, 0.0)
+    while 2 * match.pairs.count < max_hands:
+        match.play_pair()
+        pairs = match.pairs.count
+        if 2 * pairs < min_hands or pairs % check_every: continue
+        llr = match.sprt_llrs(delta)
+        if on_progress is not None: on_progress(match, llr)
+        if llr[0] >= upper: decision = 'A'
+        elif llr[1] >= upper: decision = 'B'
+        elif llr[0] <= lower and llr[1] <= lower: decision = 'equal'
+        else: continue
+        break
+
+    return {
+        'agent_a': agent_a.name,
+        'agent_b': agent_b.name,
+        'hands': 2 * match.pairs.count,
+        'mean': match.pairs.mean,
+        'ci': match.confidence_interval(),
+        'llr': llr,
+        'bounds': (lower, upper),
+        'decision': decision,
+        'variance_reduction': match.variance_reduction(),
+        'delta': delta,
+        'seed': match.seed,
+    }
+
+def format_result(result):
+    low, high = result['ci']
+    conclusion = {
+        'A': f"{result['agent_a']} is stronger",
+        'B': f"{result['agent_b']} is stronger",
+        'equal': f"difference below {result['delta']} chips/hand",
+    }.get(result['decision'], "undecided")
+    lines = [
+        f"{result['agent_a']} vs {result['agent_b']}: {result['hands']} hands (duplicate, seed {result['seed']})",
+        f"  {result['agent_a']} wins {result['mean']:+.4f} chips/hand, 95% CI [{low:+.4f}, {high:+.4f}]",
+        f"  SPRT (delta={result['delta']}): LLR A {result['llr'][0]:+.2f} / B {result['llr'][1]:+.2f}, "
+        f"bounds [{result['bounds'][0]:.2f}, {result['bounds'][1]:.2f}] -> {conclusion}",
+        f"  Variance reduction vs. independent hands: {result['variance_reduction']:.1f}x",
+    ]
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Duplicate head-to-head evaluation of two agents with SPRT early stopping.")
+    parser.add_argument('agent_a', choices=sorted(AGENTS))
+    parser.add_argument('agent_b', choices=sorted(AGENTS))
+    parser.add_argument('--max-hands', type=int, default=200000)
+    parser.add_argument('--min-hands', type=int, default=400)
+    parser.add_argument('--delta', type=float, default=0.1, help="indifference zone half-width in chips/hand")
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--random-stacks', action='store_true', help="use randomized stacks instead of standardized 200/200")
+    parser.add_argument('--allin-ev', action='store_true', help="score all-in hands by their equity instead of the runout")
+    args = parser.parse_args(argv)
+    agent_a = AGENTS[args.agent_a](name=f"A_{args.agent_a}")
+    agent_b = AGENTS[args.agent_b](name=f"B_{args.agent_b}")
+    result = evaluate(agent_a, agent_b, max_hands=args.max_hands, min_hands=args.min_hands, delta=args.delta,
+                      alpha=args.alpha, beta=args.beta, seed=args.seed, randomize_stacks=args.random_stacks,
+                      allin_ev=args.allin_ev)
+    print(format_result(result))
+    return result
+
+if __name__ == '__main__':
+    main()
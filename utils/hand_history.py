@@ -0,0 +1,209 @@
+# utils/hand_history.py
+
+import os
+import sys
+import struct
+import argparse
+import numpy as np
+
+from HULHE_env.environment import PokerEnv, ACTIONS
+from HULHE_env.dealer import Dealer, DEAL_SIZE
+from HULHE_env.cards import NUM_CARDS, STR_TO_INDEX
+from HULHE_env.history import HISTORY_ACTION_INDEX
+from utils.logger import render_human_readable
+
+# 紧凑的二进制手牌历史: 每局一条定长头部 + 每个动作1字节，一次write追加。
+# 文件头: 魔数、版本、大盲注；记录头:
+#   record_size (u2) / hand_id (u8) / button (u1) / flags (u1) / num_actions (u1) / num_board (u1)
+#   cards 9 x i1 [P0手牌x2, P1手牌x2, 公共牌x5] (未发出的公共牌为-1) / 初始筹码 2 x f4 / 结果 2 x f4
+# 动作只记录ACTIONS中的下标 (盲注是隐含的)，金额、行动顺序和结算都由PokerEnv重放得到，
+# 因此渲染出的文本与GameLogger直接写出的gamelog.txt完全一致。
+MAGIC = b'HHLOG'
+VERSION = 1
+_FILE_HEADER = struct.Struct('<5sBH')
+_RECORD_HEADER = struct.Struct(f'<HQBBBB{DEAL_SIZE}b2f2f')
+FLAG_FLOAT_STACKS = 1
+INDEX_SUFFIX = '.idx.npy'
+# 盲注之后的第一条历史记录
+FIRST_ACTION = 2
+
+def _hand_cards(state):
+    hands = state['full_info']['hands']
+    board = state['community_cards']
+    cards = [STR_TO_INDEX[c] for c in hands[0] + hands[1] + board]
+    return cards + [-1] * (DEAL_SIZE - len(cards)), len(board)
+
+def _action_codes(action_history):
+    if hasattr(action_history, 'records'): return action_history.actions[FIRST_ACTION:].tobytes()
+    return bytes(HISTORY_ACTION_INDEX[entry['action']] for entry in action_history[FIRST_ACTION:])
+
+def encode_hand(state, hand_id):
+    """
+    把一局结束时的state编码为一条二进制记录。
+    """
+    results = state['winner_info']['results']
+    players = state['players']
+    initial_stacks = [players[i]['stack'] - results[i] for i in range(2)]
+    action_history = state['action_history']
+    float_stacks = getattr(action_history, 'float_stacks', isinstance(initial_stacks[0], float))
+    cards, num_board = _hand_cards(state)
+    actions = _action_codes(action_history)
+    return _RECORD_HEADER.pack(_RECORD_HEADER.size + len(actions), hand_id, state['button_player'],
+                               FLAG_FLOAT_STACKS if float_stacks else 0, len(actions), num_board,
+                               *cards, *initial_stacks, *results) + actions
+
+def decode_hand(data, offset=0):
+    """
+    解析一条记录，返回字典 (hand_id / button / float_stacks / cards / num_board / initial_stacks / results / actions)。
+    """
+    (_, hand_id, button, flags, num_actions, num_board, *rest) = _RECORD_HEADER.unpack_from(data, offset)
+    start = offset + _RECORD_HEADER.size
+    return {
+        'hand_id': hand_id,
+        'button': button,
+        'float_stacks': bool(flags & FLAG_FLOAT_STACKS),
+        'cards': rest[:DEAL_SIZE],
+        'num_board': num_board,
+        'initial_stacks': rest[DEAL_SIZE:DEAL_SIZE + 2],
+        'results': rest[DEAL_SIZE + 2:DEAL_SIZE + 4],
+        'actions': bytes(data[start:start + num_actions]),
+    }
+
+class HandHistoryWriter:
+    """
+    追加写入二进制手牌历史。每局一次write (经过大的写缓冲)，hand_id -> 偏移量的索引在内存中累积，
+    close时写入 path + '.idx.npy'；索引缺失时 (例如进程中途被杀) 读者会扫描数据文件重建。
+    """
+    def __init__(self, path, big_blind=2, buffering=1 << 20):
+        self.path = path
+        self.file = open(path, 'wb', buffering=buffering)
+        self.file.write(_FILE_HEADER.pack(MAGIC, VERSION, big_blind))
+        self._offset = _FILE_HEADER.size
+        self._hand_ids = []
+        self._offsets = []
+
+    @property
+    def name(self):
+        return self.path
+
+    def write(self, state, hand_id):
+        record = encode_hand(state, hand_id)
+        self.file.write(record)
+        self._hand_ids.append(hand_id)
+        self._offsets.append(self._offset)
+        self._offset += len(record)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        np.save(self.path + INDEX_SUFFIX, np.array([self._hand_ids, self._offsets], dtype=np.uint64).reshape(2, -1))
+
+class HandHistoryReader:
+    """
+    内存映射读取二进制手牌历史，按hand_id随机访问，并通过PokerEnv重放还原完整的结束状态。
+    """
+    def __init__(self, path):
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, self.big_blind = _FILE_HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC: raise ValueError(f"'{path}' is not a hand history file.")
+        if version != VERSION: raise ValueError(f"Unsupported hand history version {version}.")
+        index_path = path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            self.hand_ids, self.offsets = np.load(index_path)
+        else:
+            self.hand_ids, self.offsets = self._scan()
+        self._sorted = bool(np.all(np.diff(self.hand_ids.astype(np.int64)) > 0))
+        self._env = None
+
+    def _scan(self):
+        hand_ids, offsets = [], []
+        offset, end = _FILE_HEADER.size, len(self.data)
+        while offset + _RECORD_HEADER.size <= end:
+            record_size, hand_id = struct.unpack_from('<HQ', self.data, offset)
+            # 末尾被截断的记录不计入
+            if offset + record_size > end: break
+            hand_ids.append(hand_id)
+            offsets.append(offset)
+            offset += record_size
+        return np.array(hand_ids, dtype=np.uint64), np.array(offsets, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.hand_ids)
+
+    def _position(self, hand_id):
+        if self._sorted:
+            i = int(np.searchsorted(self.hand_ids, hand_id))
+            if i < len(self.hand_ids) and self.hand_ids[i] == hand_id: return i
+        else:
+            matches = np.flatnonzero(self.hand_ids == hand_id)
+            if len(matches): return int(matches[0])
+        raise KeyError(hand_id)
+
+    def record(self, hand_id):
+        return decode_hand(self.data, int(self.offsets[self._position(hand_id)]))
+
+    def records(self, first=None, last=None):
+        """
+        按文件顺序迭代hand_id在[first, last]内的记录。
+        """
+        for hand_id, offset in zip(self.hand_ids.tolist(), self.offsets.tolist()):
+            if (first is None or hand_id >= first) and (last is None or hand_id <= last):
+                yield decode_hand(self.data, offset)
+
+    def replay(self, record):
+        """
+        用一个只含这一局发牌的Dealer在PokerEnv上重放动作，返回结束时的状态视图 (在下一次replay前有效)。
+        """
+        cards = list(record['cards'])
+        # 没有发出的公共牌不会被用到，用剩余的牌补齐即可
+        unused = iter(sorted(set(range(NUM_CARDS)) - set(cards)))
+        cards = [c if c >= 0 else next(unused) for c in cards]
+        s0, s1 = record['initial_stacks']
+        if record['float_stacks']:
+            total = s0 + s1
+        else:
+            s0, total = int(s0), int(s0) + int(s1)
+        if self._env is None: self._env = PokerEnv(initial_total_stack=total, big_blind=self.big_blind)
+        env = self._env
+        env.initial_total_stack = total
+        env.dealer = Dealer(deals=([cards], [s0 if not record['float_stacks'] else 0]))
+        env.button_player = 1 - record['button']
+        state = env.reset(randomize_stacks=not record['float_stacks'])
+        for action in record['actions']:
+            state = env.step(ACTIONS[action])
+        results = np.array(state['winner_info']['results'], dtype=np.float32)
+        if not state['done'] or len(state['community_cards']) != record['num_board'] or list(results) != list(record['results']):
+            raise ValueError(f"Hand #{record['hand_id']} did not replay to the recorded end.")
+        return state
+
+    def render(self, hand_id):
+        return render_human_readable(self.replay(self.record(hand_id)), hand_id)
+
+    def render_range(self, first=None, last=None):
+        for record in self.records(first, last):
+            yield render_human_readable(self.replay(record), record['hand_id'])
+
+def _parse_range(text):
+    first, separator, last = text.partition('-')
+    first = int(first) if first else None
+    if not separator: return first, first
+    return first, int(last) if last else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render hands from a binary hand history in the gamelog.txt text format.")
+    parser.add_argument('path', help="hand history file (hands.bin)")
+    parser.add_argument('hands', nargs='*', help="hand ids or ranges such as 10-20, 5- or -5 (default: all hands)")
+    parser.add_argument('-o', '--output', default=None, help="write to this file instead of stdout")
+    args = parser.parse_args(argv)
+    reader = HandHistoryReader(args.path)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for spec in args.hands or ['-']:
+            for text in reader.render_range(*_parse_range(spec)): out.write(text)
+    finally:
+        if args.output: out.close()
+
+if __name__ == '__main__':
+    main()
@@ -2,69 +2,199 @@
 
 import os
 import csv
+import queue
 import datetime
+import threading
+
+from utils.dataset import ShardWriter
+
+# 向量化数据的存储格式: CSV文本，或二进制.npy分片 (npy_compact为位打包+float16的紧凑编码)
+DATA_FORMATS = ('csv', 'npy', 'npy_compact')
+# 手牌历史的存储格式: gamelog.txt文本，或紧凑的二进制hands.bin (按需由utils/hand_history.py渲染为文本)
+HAND_HISTORY_FORMATS = ('text', 'binary')
+WRITE_BUFFER_SIZE = 1 << 20
+WRITE_BATCH_SIZE = 1024
+
+def _history_row(action_history, index):
+    """
+    读取第index个动作: (round, player, action, 该玩家动作后的筹码, 底池, 返回当时公共牌的函数)。
+    ActionHistory直接读取记录数组，旧版的字典列表则读取state_after_action。
+    """
+    if hasattr(action_history, 'row'):
+        action_round, player_idx, action, stacks, pot, _ = action_history.row(index)
+        return action_round, player_idx, action, stacks[player_idx], pot, lambda: action_history.community_cards_at(index)
+    entry = action_history[index]
+    state_after = entry['state_after_action']
+    player_idx = entry['player']
+    return entry['round'], player_idx, entry['action'], state_after['players'][player_idx]['stack'], state_after['pot'], lambda: state_after['community_cards']
+
+def render_human_readable(state, hand_id):
+    """
+    将一局结束时的state渲染为gamelog.txt中的文本格式。
+    """
+    lines = []
+    lines.append(f"--- Hand #{hand_id} ---\n")
+    lines.append(f"Button is Player {state['button_player']}\n")
+    
+    p0_final_stack = state['players'][0]['stack']
+    p1_final_stack = state['players'][1]['stack']
+    p0_result = state['winner_info']['results'][0]
+    p1_result = state['winner_info']['results'][1]
+    p0_initial_stack = p0_final_stack - p0_result
+    p1_initial_stack = p1_final_stack - p1_result
+    
+    p0_hand = state['full_info']['hands'][0]
+    p1_hand = state['full_info']['hands'][1]
+
+    lines.append(f"Player 0, Hand: {p0_hand}, Stack: {p0_initial_stack}\n")
+    lines.append(f"Player 1, Hand: {p1_hand}, Stack: {p1_initial_stack}\n")
+    lines.append("Pot: 0\n\n--- Actions ---\n")
+    
+    current_round = ''
+    action_history = state['action_history']
+    for i in range(len(action_history)):
+        action_round, player_idx, action, stack, pot, community_cards = _history_row(action_history, i)
+        if action_round != current_round:
+            current_round = action_round
+            lines.append(f"\n** {current_round.upper()} **\n")
+            if current_round != 'preflop' and community_cards():
+                lines.append(f"Community Cards: {community_cards()}\n")
+        lines.append(f"Player {player_idx}, action: {action}, Stack: {stack}, Pot: {pot}\n")
+    
+    lines.append(f"Pot: {state['pot']}\n\n--- Results ---\n")
+    lines.append(f"Community Cards: {state['community_cards']}\n")
+    lines.append(f"Player 0, Hand: {p0_hand}, Stack: {state['players'][0]['stack']}\n")
+    lines.append(f"Player 1, Hand: {p1_hand}, Stack: {state['players'][1]['stack']}\n")
+    
+    # --- 新增逻辑: 明确标明赢家 ---
+    winner = state['winner_info'].get('winner')
+    if winner == -1:
+        lines.append("Winner: Tie\n")
+    else:
+        lines.append(f"Winner: Player {winner}\n")
+        
+    lines.append("="*30 + "\n\n")
+    return ''.join(lines)
+
+# 异步模式下写入线程处理的记录类型
+_HUMAN, _VECTOR, _STOP = range(3)
 
 class GameLogger:
-    def __init__(self, base_log_dir='logs'):
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.log_dir = os.path.join(base_log_dir, timestamp)
+    """
+    记录人类可读日志 (gamelog.txt) 和向量化训练数据。
+    async_mode=True 时，日志记录被放入有界队列，由专门的写入线程批量渲染并合并成大块写入；
+    队列满时调用方会被阻塞 (背压)，close()会等待队列清空并回收线程。
+    human_log_every=K 时只为每K局中的1局渲染人类可读日志。
+    hand_history='binary' 时不渲染文本，而是把每局编码为一条紧凑的二进制记录追加到hands.bin
+    (约为文本的1/14)，需要时用 python -m utils.hand_history 渲染为与gamelog.txt相同的文本。
+    渲染时按文件头中的大盲注重放牌局，因此big_blind必须与产生这些牌局的环境一致 (传入env.big_blind)。
+    """
+    def __init__(self, base_log_dir='logs', data_format='csv', run_name=None,
+                 async_mode=False, queue_size=4096, human_log_every=1, hand_history='text', big_blind=2):
+        if data_format not in DATA_FORMATS: raise ValueError(f"Unknown data format '{data_format}'.")
+        if hand_history not in HAND_HISTORY_FORMATS: raise ValueError(f"Unknown hand history format '{hand_history}'.")
+        if run_name is None: run_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.log_dir = os.path.join(base_log_dir, run_name)
         if not os.path.exists(self.log_dir): os.makedirs(self.log_dir)
-        self.human_log_file = open(os.path.join(self.log_dir, 'gamelog.txt'), 'w')
-        self.vector_log_file = open(os.path.join(self.log_dir, 'training_data.csv'), 'w', newline='')
-        self.csv_writer = csv.writer(self.vector_log_file)
-        self._initialize_csv()
+        buffering = WRITE_BUFFER_SIZE if async_mode else -1
+        self.hand_history_writer = None
+        if hand_history == 'binary':
+            # 延迟导入: hand_history模块依赖本模块的render_human_readable
+            from utils.hand_history import HandHistoryWriter
+            self.hand_history_writer = HandHistoryWriter(os.path.join(self.log_dir, 'hands.bin'), big_blind=big_blind)
+            # human_log_file.name仍指向手牌历史文件，供调用方显示/记录路径
+            self.human_log_file = self.hand_history_writer
+        else:
+            self.human_log_file = open(os.path.join(self.log_dir, 'gamelog.txt'), 'w', buffering=buffering)
+        self.data_format = data_format
+        self.human_log_every = human_log_every
+        self.vector_log_file = None
+        self.shard_writer = None
+        if data_format == 'csv':
+            self.vector_log_path = os.path.join(self.log_dir, 'training_data.csv')
+            self.vector_log_file = open(self.vector_log_path, 'w', newline='', buffering=buffering)
+            self.csv_writer = csv.writer(self.vector_log_file)
+            self._initialize_csv()
+        else:
+            self.vector_log_path = os.path.join(self.log_dir, 'training_data')
+            self.shard_writer = ShardWriter(self.vector_log_path, data_format='raw' if data_format == 'npy' else 'compact')
+
+        self.async_mode = async_mode
+        self._writer_error = None
+        if async_mode:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._writer_thread = threading.Thread(target=self._writer_loop, name='GameLoggerWriter', daemon=True)
+            self._writer_thread.start()
 
     def _initialize_csv(self):
         header = [f'v{i}' for i in range(301)] + ['result']
         self.csv_writer.writerow(header)
 
     def log_human_readable(self, state, hand_id):
-        self.human_log_file.write(f"--- Hand #{hand_id} ---\n")
-        self.human_log_file.write(f"Button is Player {state['button_player']}\n")
-        
-        p0_final_stack = state['players'][0]['stack']
-        p1_final_stack = state['players'][1]['stack']
-        p0_result = state['winner_info']['results'][0]
-        p1_result = state['winner_info']['results'][1]
-        p0_initial_stack = p0_final_stack - p0_result
-        p1_initial_stack = p1_final_stack - p1_result
-        
-        p0_hand = state['full_info']['hands'][0]
-        p1_hand = state['full_info']['hands'][1]
-
-        self.human_log_file.write(f"Player 0, Hand: {p0_hand}, Stack: {p0_initial_stack}\n")
-        self.human_log_file.write(f"Player 1, Hand: {p1_hand}, Stack: {p1_initial_stack}\n")
-        self.human_log_file.write("Pot: 0\n\n--- Actions ---\n")
-        
-        current_round = ''
-        for entry in state['action_history']:
-            action_round = entry['round']
-            if action_round != current_round:
-                current_round = action_round
-                self.human_log_file.write(f"\n** {current_round.upper()} **\n")
-                if current_round != 'preflop' and entry['state_after_action']['community_cards']:
-                    self.human_log_file.write(f"Community Cards: {entry['state_after_action']['community_cards']}\n")
-            player_idx, action, state_after = entry['player'], entry['action'], entry['state_after_action']
-            self.human_log_file.write(f"Player {player_idx}, action: {action}, Stack: {state_after['players'][player_idx]['stack']}, Pot: {state_after['pot']}\n")
-        
-        self.human_log_file.write(f"Pot: {state['pot']}\n\n--- Results ---\n")
-        self.human_log_file.write(f"Community Cards: {state['community_cards']}\n")
-        self.human_log_file.write(f"Player 0, Hand: {p0_hand}, Stack: {state['players'][0]['stack']}\n")
-        self.human_log_file.write(f"Player 1, Hand: {p1_hand}, Stack: {state['players'][1]['stack']}\n")
-        
-        # --- 新增逻辑: 明确标明赢家 ---
-        winner = state['winner_info'].get('winner')
-        if winner == -1:
-            self.human_log_file.write("Winner: Tie\n")
+        """
+        记录一局的人类可读日志。human_log_every=K 时只渲染hand_id为K的倍数的牌局。
+        """
+        if hand_id % self.human_log_every: return
+        if self.hand_history_writer is not None:
+            # 二进制记录的编码只需几微秒，直接在调用线程中写入
+            self.hand_history_writer.write(state, hand_id)
+        elif self.async_mode:
+            # 状态视图会随环境推进而变化，入队前需固化为独立的字典
+            if hasattr(state, 'to_dict'): state = state.to_dict()
+            self._enqueue((_HUMAN, state, hand_id))
         else:
-            self.human_log_file.write(f"Winner: Player {winner}\n")
-            
-        self.human_log_file.write("="*30 + "\n\n")
+            self.human_log_file.write(render_human_readable(state, hand_id))
 
     def log_vectorized(self, psv, result):
-        row = list(psv) + [result]
-        self.csv_writer.writerow(row)
+        if self.async_mode:
+            self._enqueue((_VECTOR, psv, result))
+        else:
+            self._write_vectors([(psv, result)])
+
+    def _write_vectors(self, rows):
+        if self.shard_writer is not None:
+            for psv, result in rows: self.shard_writer.append(psv, result)
+        else:
+            self.csv_writer.writerows(list(psv) + [result] for psv, result in rows)
+
+    def _enqueue(self, record):
+        if self._writer_error is not None: raise RuntimeError("GameLogger writer thread failed.") from self._writer_error
+        self._queue.put(record)
+
+    def _writer_loop(self):
+        """
+        写入线程: 每次取出队列中已有的全部记录 (最多WRITE_BATCH_SIZE条)，渲染后合并为一次写入。
+        """
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < WRITE_BATCH_SIZE: batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                texts, rows = [], []
+                for record in batch:
+                    if record[0] == _HUMAN: texts.append(render_human_readable(record[1], record[2]))
+                    elif record[0] == _VECTOR: rows.append((record[1], record[2]))
+                    else: stopping = True
+                if texts: self.human_log_file.write(''.join(texts))
+                if rows: self._write_vectors(rows)
+            except Exception as e:
+                self._writer_error = e
+            finally:
+                for _ in batch: self._queue.task_done()
+
+    def flush(self):
+        if self.async_mode: self._queue.join()
+        self.human_log_file.flush()
+        if self.vector_log_file is not None: self.vector_log_file.flush()
 
     def close(self):
+        if self.async_mode:
+            self._queue.put((_STOP, None, None))
+            self._writer_thread.join()
         self.human_log_file.close()
-        self.vector_log_file.close()
\ No newline at end of file
+        if self.shard_writer is not None: self.shard_writer.close()
+        else: self.vector_log_file.close()
+        if self._writer_error is not None: raise RuntimeError("GameLogger writer thread failed.") from self._writer_error
@@ -0,0 +1,216 @@
+# utils/parallel_runner.py
+
+import os
+import json
+import time
+import queue
+import datetime
+import multiprocessing as mp
+import numpy as np
+
+from HULHE_env.environment import PokerEnv
+from HULHE_env.dealer import fresh_seed
+from agents.aggressive_agent import AggressiveAgent
+from utils.dataset import MANIFEST_NAME
+from utils.encoder import encode_state_to_psv
+from utils.logger import GameLogger
+from utils.profiler import Profiler
+
+def default_agent_factory(seed):
+    return [AggressiveAgent("Bot_A"), AggressiveAgent("Bot_B")]
+
+def play_hands(env, agents, logger, first_hand_id, num_hands, randomize_stacks=True, on_hand_done=None,
+               encode=encode_state_to_psv, result_key='results'):
+    """
+    在单个环境上连续进行num_hands局，并把每局写入logger。
+    result_key选择winner_info中作为训练标签的字段 ('results' 或 allin_ev模式下的 'ev_results')。
+    """
+    for hand_id in range(first_hand_id, first_hand_id + num_hands):
+        state = env.reset(randomize_stacks=randomize_stacks)
+        done = False
+
+        while not done:
+            current_player_id = state['current_player']
+            legal_actions = env.get_legal_actions()
+
+            if not legal_actions:
+                state = env._get_state()
+                done = state['done']
+                continue
+
+            agent = agents[current_player_id]
+            action = agent.act(state, legal_actions)
+            state = env.step(action)
+            done = state['done']
+
+        final_state = state
+        logger.log_human_readable(final_state, hand_id)
+
+        results = final_state['winner_info'][result_key]
+        for i in range(2):
+            # We encode the final state for simplicity, though in training we'd encode pre-decision states
+            psv = encode(final_state, player_perspective=i)
+            logger.log_vectorized(psv, results[i])
+
+        if on_hand_done is not None: on_hand_done(hand_id)
+
+def chunk_seeds(master_seed, num_chunks):
+    """
+    由主种子派生每个分块独立的随机数种子。分块的划分只取决于num_hands和chunk_size，
+    与worker数量无关，因此同一主种子在任意worker数下都会产生完全相同的牌局。
+    """
+    children = np.random.SeedSequence(master_seed).spawn(num_chunks)
+    return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in children]
+
+# --- worker进程 ---
+_progress_queue = None
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+def instrument(profiler, env, agents, logger):
+    """
+    为一次自博弈运行的所有组件挂上profiler，返回被计时的编码函数。
+    """
+    profiler.instrument_env(env)
+    profiler.instrument_logger(logger)
+    for seat, agent in enumerate(agents): profiler.instrument_agent(agent, seat)
+    return profiler.wrap(encode_state_to_psv, 'encoder.encode_state_to_psv')
+
+def _run_chunk(task):
+    start_time = time.time()
+    env = PokerEnv(seed=task['seed'], allin_ev=task['allin_ev'])
+    agents = task['agent_factory'](task['seed'])
+    logger = GameLogger(base_log_dir=task['run_dir'], data_format=task['data_format'], run_name=task['name'],
+                        async_mode=task['async_logging'], human_log_every=task['human_log_every'],
+                        hand_history=task['hand_history'], big_blind=env.big_blind)
+    profiler = Profiler() if task['profile'] else None
+    encode = instrument(profiler, env, agents, logger) if profiler else encode_state_to_psv
+    progress_every = task['progress_every']
+
+    def report(hand_id):
+        hands_done = hand_id - task['first_hand_id'] + 1
+        if _progress_queue is not None and (hands_done % progress_every == 0 or hands_done == task['num_hands']):
+            _progress_queue.put((task['chunk'], hands_done))
+
+    try:
+        play_hands(env, agents, logger, task['first_hand_id'], task['num_hands'], task['randomize_stacks'], report, encode,
+                   'ev_results' if task['allin_ev'] else 'results')
+    finally:
+        logger.close()
+    return {
+        'profile': profiler.summary() if profiler else None,
+        'chunk': task['chunk'],
+        'seed': task['seed'],
+        'first_hand_id': task['first_hand_id'],
+        'num_hands': task['num_hands'],
+        'log_dir': task['name'],
+        'human_log': os.path.relpath(logger.human_log_file.name, task['run_dir']),
+        'training_data': os.path.relpath(logger.vector_log_path, task['run_dir']),
+        'elapsed': time.time() - start_time,
+    }
+
+# --- 父进程 ---
+def _merge_manifest(run_dir, chunks, master_seed, data_format, randomize_stacks, allin_ev=False):
+    """
+    按分块顺序合并各worker的输出。npy格式下合并后的manifest可直接由ShardReader(run_dir)读取。
+    """
+    manifest = {
+        'master_seed': master_seed,
+        'num_hands': sum(c['num_hands'] for c in chunks),
+        'randomize_stacks': randomize_stacks,
+        'allin_ev': allin_ev,
+        'data_format': data_format,
+        'chunks': chunks,
+    }
+    if data_format != 'csv':
+        shards = []
+        for chunk in chunks:
+            with open(os.path.join(run_dir, chunk['training_data'], MANIFEST_NAME)) as f:
+                chunk_manifest = json.load(f)
+            for shard in chunk_manifest['shards']:
+                files = {key: os.path.join(chunk['training_data'], name) for key, name in shard['files'].items()}
+                shards.append({'rows': shard['rows'], 'files': files})
+        manifest.update({
+            'format': chunk_manifest['format'],
+            'psv_dim': chunk_manifest['psv_dim'],
+            'shard_size': chunk_manifest['shard_size'],
+            'num_rows': sum(s['rows'] for s in shards),
+            'shards': shards,
+        })
+    with open(os.path.join(run_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def run_parallel(num_hands, num_workers=None, master_seed=None, randomize_stacks=True, data_format='csv',
+                 chunk_size=1000, agent_factory=default_agent_factory, base_log_dir='logs', progress_every=100,
+                 async_logging=False, human_log_every=1, profile=False, allin_ev=False, hand_history='text'):
+    """
+    将num_hands局自博弈按固定大小的分块分发到进程池中执行。
+    每个分块拥有独立的PokerEnv、agents、随机数流和日志目录；结束时在运行目录下写出合并的manifest.json。
+    """
+    if num_workers is None: num_workers = os.cpu_count() or 1
+    if master_seed is None: master_seed = fresh_seed()
+    run_dir = os.path.join(base_log_dir, datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
+    if not os.path.exists(run_dir): os.makedirs(run_dir)
+
+    num_chunks = (num_hands + chunk_size - 1) // chunk_size
+    tasks = []
+    for chunk, seed in enumerate(chunk_seeds(master_seed, num_chunks)):
+        tasks.append({
+            'chunk': chunk,
+            'name': f"chunk_{chunk:05d}",
+            'seed': seed,
+            'first_hand_id': chunk * chunk_size + 1,
+            'num_hands': min(chunk_size, num_hands - chunk * chunk_size),
+            'run_dir': run_dir,
+            'randomize_stacks': randomize_stacks,
+            'data_format': data_format,
+            'agent_factory': agent_factory,
+            'progress_every': progress_every,
+            'async_logging': async_logging,
+            'human_log_every': human_log_every,
+            'profile': profile,
+            'allin_ev': allin_ev,
+            'hand_history': hand_history,
+        })
+
+    print(f"Running {num_hands} hands in {num_chunks} chunks on {num_workers} workers (master seed {master_seed}).")
+    print(f"Logging to '{run_dir}/'")
+    start_time = time.time()
+    profiler = Profiler() if profile else None
+    if num_workers == 1:
+        chunks = [_run_chunk(task) for task in tasks]
+    else:
+        ctx = mp.get_context()
+        progress_queue = ctx.Queue()
+        hands_done = [0] * num_chunks
+        with ctx.Pool(num_workers, initializer=_init_worker, initargs=(progress_queue,)) as pool:
+            async_result = pool.map_async(_run_chunk, tasks, chunksize=1)
+            last_report = 0
+            while not async_result.ready():
+                try:
+                    chunk, done = progress_queue.get(timeout=0.1)
+                    hands_done[chunk] = done
+                except queue.Empty:
+                    pass
+                total = sum(hands_done)
+                if total - last_report >= max(progress_every, num_hands // 20):
+                    last_report = total
+                    elapsed = time.time() - start_time
+                    print(f"  {total}/{num_hands} hands completed ({total / elapsed:.0f} hands/sec).")
+            chunks = async_result.get()
+
+    elapsed = time.time() - start_time
+    if profiler:
+        # 各worker的耗时是CPU时间之和，占比相对于父进程的墙钟时间
+        for chunk in chunks: profiler.merge(chunk.pop('profile'))
+        print(profiler.format_report())
+        profiler.dump(os.path.join(run_dir, 'profile.json'))
+    else:
+        for chunk in chunks: chunk.pop('profile')
+    manifest = _merge_manifest(run_dir, sorted(chunks, key=lambda c: c['chunk']), master_seed, data_format, randomize_stacks, allin_ev)
+    print(f"Finished {num_hands} hands in {elapsed:.1f}s ({num_hands / elapsed:.0f} hands/sec).")
+    print(f"Merged manifest: {os.path.join(run_dir, MANIFEST_NAME)}")
+    return manifest
@@ -0,0 +1,98 @@
+# utils/profiler.py
+
+import json
+import time
+import functools
+from collections import defaultdict
+
+class Profiler:
+    """
+    可选的热路径插桩。只有显式调用instrument_*的对象才会被包装，未启用时没有任何额外开销。
+    启用后记录各阶段的累计耗时与调用次数 (包含嵌套调用，例如step内部的get_legal_actions)，
+    以及按结束方式统计的牌局数 (fold / showdown / all-in) 和每局平均动作数。
+    """
+    ENV_METHODS = ('reset', 'step', 'get_legal_actions', '_showdown')
+    LOGGER_METHODS = ('log_human_readable', 'log_vectorized', 'close')
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.start_time = time.perf_counter()
+
+    def wrap(self, func, name):
+        times, calls, perf_counter = self.times, self.calls, time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times[name] += perf_counter() - start
+                calls[name] += 1
+        return wrapper
+
+    def _wrap_methods(self, obj, prefix, methods):
+        for method in methods:
+            setattr(obj, method, self.wrap(getattr(obj, method), f"{prefix}.{method}"))
+        return obj
+
+    def instrument_env(self, env):
+        self._wrap_methods(env, 'env', self.ENV_METHODS)
+        finalize_hand = env._finalize_hand
+
+        def counting_finalize_hand(winner, reason):
+            finalize_hand(winner, reason)
+            if reason == 'showdown' and any(p['is_all_in'] for p in env.players): reason = 'all_in'
+            self.counters[f"hands.{reason}"] += 1
+            self.counters['hands'] += 1
+            # 不计入盲注
+            self.counters['actions'] += len(env.action_history) - 2
+        env._finalize_hand = counting_finalize_hand
+        return env
+
+    def instrument_logger(self, logger):
+        return self._wrap_methods(logger, 'logger', self.LOGGER_METHODS)
+
+    def instrument_agent(self, agent, seat):
+        agent.act = self.wrap(agent.act, f"agent{seat}.act")
+        agent.act_batch = self.wrap(agent.act_batch, f"agent{seat}.act_batch")
+        return agent
+
+    def summary(self):
+        hands = self.counters['hands']
+        return {
+            'elapsed': time.perf_counter() - self.start_time,
+            'phases': {name: {'calls': self.calls[name], 'total': self.times[name],
+                              'per_call_us': 1e6 * self.times[name] / self.calls[name]}
+                       for name in sorted(self.times, key=self.times.get, reverse=True)},
+            'counters': dict(self.counters),
+            'avg_actions_per_hand': self.counters['actions'] / hands if hands else 0.0,
+        }
+
+    def merge(self, summary):
+        """
+        合并另一个Profiler的summary (例如多进程worker返回的结果)。
+        """
+        for name, phase in summary['phases'].items():
+            self.times[name] += phase['total']
+            self.calls[name] += phase['calls']
+        for name, value in summary['counters'].items():
+            self.counters[name] += value
+
+    def format_report(self):
+        summary = self.summary()
+        elapsed = summary['elapsed']
+        hands = summary['counters'].get('hands', 0)
+        lines = [f"--- Profile: {hands} hands in {elapsed:.1f}s ({hands / elapsed if elapsed else 0:.0f} hands/sec) ---"]
+        for name, phase in summary['phases'].items():
+            share = 100 * phase['total'] / elapsed if elapsed else 0
+            lines.append(f"  {name:<28} {phase['calls']:>10} calls {phase['total']:>9.3f}s {share:>5.1f}% {phase['per_call_us']:>9.2f} us/call")
+        end_reasons = ', '.join(f"{k.split('.', 1)[1]}={v}" for k, v in sorted(summary['counters'].items()) if k.startswith('hands.'))
+        lines.append(f"  end reasons: {end_reasons or '-'}; avg actions/hand: {summary['avg_actions_per_hand']:.2f}")
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
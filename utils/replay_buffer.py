@@ -0,0 +1,188 @@
+# utils/replay_buffer.py
+
+import os
+import json
+import numpy as np
+
+from utils.encoder import PSV_DIM
+from utils.dataset import FORMATS, NUMERIC_DIMS, ONE_HOT_DIMS, pack_psv, unpack_psv
+
+META_NAME = 'replay.json'
+# 游标文件: [head (下一个写入位置), size (有效样本数), total (累计写入数)]
+HEADER_NAME = 'header.npy'
+TREE_NAME = 'priority_tree.npy'
+
+def _column_specs(data_format):
+    if data_format == 'raw':
+        columns = {'psv': (np.float32, (PSV_DIM,))}
+    else:
+        columns = {'bits': (np.uint8, ((len(ONE_HOT_DIMS) + 7) // 8,)), 'numerics': (np.float16, (len(NUMERIC_DIMS),))}
+    columns['result'] = (np.float32, ())
+    return columns
+
+class ReplayBuffer:
+    """
+    README 5.2中的经验池: 基于内存映射文件的定长环形缓冲区，保存(PSV, result)样本。
+    - 数据和游标都在磁盘上 (path目录)，容量可远大于内存；重新打开同一目录即可从上次的位置继续。
+    - 单写者、无锁: append先写入数据，再推进header中的游标，读者只会采样已发布的样本。
+      其他进程可用readonly=True打开同一目录进行采样 (环形覆盖时，正被改写的旧样本可能被读到一半)。
+    - sample_uniform / sample_prioritized 一次fancy indexing从内存映射中gather出连续的批量数组，
+      可传入预分配的out避免分配。优先级采样使用同样保存在内存映射中的sum-tree (与Prioritized Experience Replay相同)。
+    data_format与dataset.py相同: 'raw' 为float32的PSV (1.2KB/样本)，'compact' 为位打包+float16 (151字节/样本)。
+    """
+    def __init__(self, path, capacity=1_000_000, data_format='raw', prioritized=False, alpha=0.6, seed=None, readonly=False):
+        meta_path = os.path.join(path, META_NAME)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f: meta = json.load(f)
+        else:
+            if readonly: raise FileNotFoundError(meta_path)
+            if data_format not in FORMATS: raise ValueError(f"Unknown data format '{data_format}'.")
+            meta = {'capacity': capacity, 'format': data_format, 'prioritized': prioritized, 'alpha': alpha}
+            self._create(path, meta)
+        self.path = path
+        self.capacity = meta['capacity']
+        self.data_format = meta['format']
+        self.prioritized = meta['prioritized']
+        self.alpha = meta['alpha']
+        self.readonly = readonly
+        self.rng = np.random.default_rng(seed)
+
+        mode = 'r' if readonly else 'r+'
+        self.columns = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode=mode) for key in _column_specs(self.data_format)}
+        self.header = np.load(os.path.join(path, HEADER_NAME), mmap_mode=mode)
+        if self.prioritized:
+            # 以1为根的sum-tree，叶子从tree_size开始；tree[0]不属于树，用来保存当前的最大优先级
+            self.tree = np.load(os.path.join(path, TREE_NAME), mmap_mode=mode)
+            self.tree_size = len(self.tree) // 2
+
+    @staticmethod
+    def _create(path, meta):
+        if not os.path.exists(path): os.makedirs(path)
+        capacity = meta['capacity']
+        for key, (dtype, shape) in _column_specs(meta['format']).items():
+            # open_memmap只写文件头并扩展文件长度 (稀疏文件)，不会占用内存
+            np.lib.format.open_memmap(os.path.join(path, f"{key}.npy"), mode='w+', dtype=dtype, shape=(capacity,) + shape).flush()
+        np.save(os.path.join(path, HEADER_NAME), np.zeros(3, dtype=np.int64))
+        if meta['prioritized']:
+            tree_size = 1 << max(capacity - 1, 1).bit_length()
+            tree = np.lib.format.open_memmap(os.path.join(path, TREE_NAME), mode='w+', dtype=np.float64, shape=(2 * tree_size,))
+            tree[0] = 1.0
+            tree.flush()
+        with open(os.path.join(path, META_NAME), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    def __len__(self):
+        return int(self.header[1])
+
+    @property
+    def total_appended(self):
+        return int(self.header[2])
+
+    # --- 写入 ---
+    def append(self, psv, result, priority=None):
+        self.append_batch(np.asarray(psv, dtype=np.float32).reshape(1, PSV_DIM), [result],
+                          None if priority is None else [priority])
+
+    def append_batch(self, psvs, results, priorities=None):
+        """
+        追加一批样本；超过容量时覆盖最旧的样本。新样本的优先级默认为当前的最大优先级。
+        """
+        psvs = np.asarray(psvs, dtype=np.float32).reshape(-1, PSV_DIM)
+        results = np.asarray(results, dtype=np.float32)
+        # 累计写入数按整批计算 (超过容量的部分写入后立即被覆盖，等价于只写最后capacity行)
+        appended = len(psvs)
+        if len(psvs) > self.capacity:
+            psvs, results = psvs[-self.capacity:], results[-self.capacity:]
+            if priorities is not None: priorities = np.asarray(priorities)[-self.capacity:]
+        count = len(psvs)
+        if count == 0: return
+        head, size, total = (int(v) for v in self.header)
+        indices = (head + np.arange(count)) % self.capacity
+
+        # 1. 写入数据 (连续区间直接切片赋值，跨越末尾时分两段)
+        first = min(count, self.capacity - head)
+        if self.data_format == 'raw':
+            arrays = {'psv': psvs}
+        else:
+            bits, numerics = pack_psv(psvs)
+            arrays = {'bits': bits, 'numerics': numerics}
+        arrays['result'] = results
+        for key, array in arrays.items():
+            column = self.columns[key]
+            column[head:head + first] = array[:first]
+            if first < count: column[:count - first] = array[first:]
+        if self.prioritized:
+            self.update_priorities(indices, np.full(count, self.tree[0]) if priorities is None else priorities)
+
+        # 2. 发布: 最后推进游标
+        self.header[2] = total + appended
+        self.header[1] = min(size + count, self.capacity)
+        self.header[0] = (head + count) % self.capacity
+
+    def flush(self):
+        for column in self.columns.values(): column.flush()
+        if self.prioritized: self.tree.flush()
+        self.header.flush()
+
+    # --- 采样 ---
+    def _gather(self, indices, out=None):
+        """
+        按下标从内存映射中gather出 (psvs, results)。采样方法传入的下标都是升序的，以提高页面局部性。
+        """
+        out = out or {}
+        results = np.take(self.columns['result'], indices, axis=0, out=out.get('results'))
+        if self.data_format == 'raw':
+            psvs = np.take(self.columns['psv'], indices, axis=0, out=out.get('psvs'))
+        else:
+            psvs = unpack_psv(self.columns['bits'][indices], self.columns['numerics'][indices], out=out.get('psvs'))
+        return psvs, results
+
+    def sample_uniform(self, batch_size, out=None):
+        """
+        均匀有放回采样，返回 (psvs, results, indices)。
+        out可为{'psvs': (B, 301) float32, 'results': (B,) float32}形式的预分配数组。
+        """
+        size = len(self)
+        if size == 0: raise ValueError("Replay buffer is empty.")
+        indices = np.sort(self.rng.integers(0, size, size=batch_size))
+        psvs, results = self._gather(indices, out)
+        return psvs, results, indices
+
+    def sample_prioritized(self, batch_size, beta=0.4, out=None):
+        """
+        按 priority^alpha 成比例的分层采样，返回 (psvs, results, indices, weights)，
+        weights为按最大值归一化的重要性采样权重 (N * P(i))^-beta。
+        """
+        if not self.prioritized: raise ValueError("Replay buffer was created without priorities.")
+        size = len(self)
+        if size == 0: raise ValueError("Replay buffer is empty.")
+        tree, tree_size = self.tree, self.tree_size
+        total = tree[1]
+        # 每个样本在自己的分层区间内取一个随机点，然后自根向下逐层定位叶子
+        targets = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        nodes = np.ones(batch_size, dtype=np.int64)
+        while nodes[0] < tree_size:
+            left = tree[2 * nodes]
+            go_right = targets >= left
+            targets -= np.where(go_right, left, 0)
+            nodes = 2 * nodes + go_right
+        indices = np.minimum(nodes - tree_size, size - 1)
+
+        probs = tree[tree_size + indices] / total
+        weights = (size * probs) ** -beta
+        weights /= weights.max()
+        psvs, results = self._gather(indices, out)
+        return psvs, results, indices, weights.astype(np.float32)
+
+    def update_priorities(self, indices, priorities):
+        """
+        设置样本的优先级 (例如训练后的TD误差)，并逐层向上更新sum-tree。
+        """
+        tree, tree_size = self.tree, self.tree_size
+        priorities = np.asarray(priorities, dtype=np.float64)
+        tree[0] = max(tree[0], float(priorities.max()))
+        nodes = np.asarray(indices, dtype=np.int64) + tree_size
+        tree[nodes] = priorities ** self.alpha
+        while nodes[0] > 1:
+            nodes = np.unique(nodes // 2)
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
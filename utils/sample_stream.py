@@ -0,0 +1,130 @@
+# utils/sample_stream.py
+
+import queue
+import traceback
+import multiprocessing as mp
+from collections import namedtuple
+import numpy as np
+
+from HULHE_env.environment import ACTIONS, ACTION_INDEX
+from utils.batch_driver import MASK_ROWS
+from utils.encoder import IncrementalPSVEncoder, PSV_DIM
+
+# 一批决策样本，每行对应某一局中的一个决策点:
+#   psv         行动者视角的决策前PSV (B, 301) float32
+#   legal_mask  合法动作掩码 (B, 4) bool，列顺序同ACTIONS
+#   action      实际选择的动作下标 (B,) int8
+#   player      行动者座位 (B,) int8
+#   reward      行动者在该局的最终净输赢 (B,) float32
+DecisionBatch = namedtuple('DecisionBatch', ['psv', 'legal_mask', 'action', 'player', 'reward'])
+
+def _empty_batch(size):
+    return DecisionBatch(np.zeros((size, PSV_DIM), dtype=np.float32), np.zeros((size, len(ACTIONS)), dtype=bool),
+                         np.zeros(size, dtype=np.int8), np.zeros(size, dtype=np.int8), np.zeros(size, dtype=np.float32))
+
+def decision_batches(env, agents, batch_size=256, num_hands=None, randomize_stacks=True, result_key='results',
+                     drop_last=False):
+    """
+    自博弈并逐批产出决策样本的生成器 (不经过磁盘)。决策前PSV由IncrementalPSVEncoder增量维护，
+    与encode_state_to_psv对同一状态的输出逐位一致。一局的奖励要到该局结束才知道，
+    因此样本按局写入批次，一局的决策可能跨越两个批次。num_hands为None时无限进行，由消费方决定何时停止。
+    每个产出的批次都是新分配的数组，消费方可以自由保留。drop_last=False时最后一个不满的批次也会产出。
+    """
+    encoder = IncrementalPSVEncoder()
+    batch = _empty_batch(batch_size)
+    filled = 0
+    hands_played = 0
+    while num_hands is None or hands_played < num_hands:
+        state = env.reset(randomize_stacks=randomize_stacks)
+        encoder.reset(state)
+        psvs, masks, actions, players = [], [], [], []
+        while not state['done']:
+            player = state['current_player']
+            legal_actions = env.get_legal_actions()
+            action = agents[player].act(state, legal_actions)
+            psvs.append(encoder.encode(player))
+            masks.append(env.get_legal_mask())
+            actions.append(ACTION_INDEX[action])
+            players.append(player)
+            state = env.step(action)
+            encoder.update(state)
+        hands_played += 1
+
+        results = state['winner_info'][result_key]
+        rewards = [results[p] for p in players]
+        count, i = len(actions), 0
+        while i < count:
+            take = min(count - i, batch_size - filled)
+            rows = slice(filled, filled + take)
+            batch.psv[rows] = psvs[i:i + take]
+            batch.legal_mask[rows] = MASK_ROWS[masks[i:i + take]]
+            batch.action[rows] = actions[i:i + take]
+            batch.player[rows] = players[i:i + take]
+            batch.reward[rows] = rewards[i:i + take]
+            filled += take
+            i += take
+            if filled == batch_size:
+                yield batch
+                batch = _empty_batch(batch_size)
+                filled = 0
+    if filled and not drop_last:
+        yield DecisionBatch(*(column[:filled] for column in batch))
+
+# --- 子进程消费者 ---
+def _consumer_main(consumer, batch_queue, result_queue):
+    try:
+        result_queue.put((True, consumer(iter(batch_queue.get, None))))
+    except BaseException:
+        result_queue.put((False, traceback.format_exc()))
+
+def stream_to_process(consumer, env, agents, batch_size=256, num_hands=None, max_pending=8, poll_interval=0.1, **kwargs):
+    """
+    在当前进程自博弈，把decision_batches产出的批次经有界队列送给子进程中的consumer(batches)，
+    batches为逐个取出批次的迭代器。队列中最多缓冲max_pending个批次，消费者跟不上时生产方阻塞 (背压)。
+    消费者可以提前返回 (例如训练了足够的步数)，生产随即停止；num_hands为None时即以此结束。
+    返回consumer的返回值；consumer抛出异常时在父进程中抛出RuntimeError。
+    consumer需要可被pickle (模块级函数)。其余参数同decision_batches。
+    """
+    ctx = mp.get_context()
+    batch_queue = ctx.Queue(maxsize=max_pending)
+    result_queue = ctx.Queue()
+    process = ctx.Process(target=_consumer_main, args=(consumer, batch_queue, result_queue), name='DecisionConsumer', daemon=True)
+    process.start()
+
+    def send(item):
+        # 带超时地重试，以便在消费者提前结束或崩溃时停止阻塞
+        while process.is_alive():
+            try:
+                batch_queue.put(item, timeout=poll_interval)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def receive():
+        while True:
+            try:
+                return result_queue.get(timeout=poll_interval)
+            except queue.Empty:
+                if process.is_alive(): continue
+            # 进程已退出: 结果若已发出则仍在管道中
+            try:
+                return result_queue.get(timeout=poll_interval)
+            except queue.Empty:
+                return False, f"Consumer process exited with code {process.exitcode}."
+
+    try:
+        consumer_done = False
+        for batch in decision_batches(env, agents, batch_size, num_hands, **kwargs):
+            if not send(batch):
+                consumer_done = True
+                break
+        if not consumer_done: send(None)
+        ok, result = receive()
+        process.join()
+    finally:
+        if process.is_alive(): process.terminate()
+        # 消费者提前退出时队列中可能还有未取走的批次，不必等待它们送达
+        batch_queue.cancel_join_thread()
+    if not ok: raise RuntimeError(f"Decision consumer failed:\n{result}")
+    return result